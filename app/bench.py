@@ -0,0 +1,250 @@
+from __future__ import annotations
+import sys
+import time
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .parser.main import list_txt_files
+from .parser.split import map_file, iter_hand_views
+from .parser import parse_hand as ph
+from .parser.parse_hand import parse_hand, add_stats
+from .parser.classes import FLOP, PREFLOP, RIVER, TURN, HandData
+from .parser.regex import DEALT_RE
+from .parser.binfmt import HandStore, StoreReader
+from .database.db import DB
+from .database.rebuild import stats_from_store
+
+
+def load_raw_hands(folder: Path, limit: int | None = None) -> List[bytes]:
+    hands: List[bytes] = []
+    for p in list_txt_files(folder):
+        with map_file(p) as mm:
+            for view, _ in iter_hand_views(mm):
+                hands.append(bytes(view))
+                if limit and len(hands) >= limit:
+                    return hands
+    return hands
+
+
+def parse_hand_baseline(lines: List[bytes] | bytes | memoryview, stats: bool = True) -> HandData:
+    """
+    parse_hand con la clasificacion de lineas de antes del dispatch: cada
+    linea pasa por la cadena de startswith y por las cinco busquedas
+    b": folds" in line ... antes de ACTION_RE, sin camino rapido para
+    folds/checks. Los handlers y el resultado son los de parse_hand; solo
+    sirve de "antes" en bench_parse.
+    """
+    if not isinstance(lines, list):
+        lines = ph._LINE_RE.findall(lines)
+    hand = ph._parse_head(lines)
+    if hand is None or not lines:
+        return hand
+    scale = hand.money_scale
+    current_street = PREFLOP
+    in_summary = False
+    for line in lines:
+        if line.startswith(b"*** FLOP"):
+            current_street = FLOP
+        elif line.startswith(b"*** TURN"):
+            current_street = TURN
+        elif line.startswith(b"*** RIVER"):
+            current_street = RIVER
+
+        if line.startswith(b"*** SUMMARY"):
+            in_summary = True
+            continue
+        if current_street == PREFLOP and line.startswith(b"Dealt to"):
+            mdealt = DEALT_RE.match(line)
+            if mdealt:
+                hand.cards = mdealt.group("cards").decode("utf-8", "replace")
+        if line.startswith(b"Seat "):
+            if not in_summary:
+                seat = ph._parse_seat(line, scale)
+                if seat is not None:
+                    hand.seats.append(seat)
+            else:
+                res = ph._parse_summary_seat(line, scale)
+                if res is not None:
+                    hand.results.append(res)
+            continue
+        if b": posts " in line:
+            post = ph._parse_post(line, scale)
+            if post is not None:
+                hand.posts.append(post)
+            continue
+        if b": " in line and (
+            b": folds" in line or
+            b": checks" in line or
+            b": bets" in line or
+            b": raises" in line or
+            b": calls" in line
+        ):
+            action = ph._parse_action(line, current_street, scale)
+            if action is not None:
+                hand.actions.append(action)
+    hand.players_seated = len(hand.seats)
+    if stats:
+        add_stats(hand)
+    return hand
+
+
+def bench_parse(
+        folder: Path,
+        limit: int | None = None,
+        rounds: int = 3,
+        parsers: Sequence[Tuple[str, Callable]] = (("antes", parse_hand_baseline), ("parse_hand", parse_hand)),
+) -> None:
+    """
+    Costo por mano de cada parser de `parsers` (incluye parse_position y
+    parse_stats) sobre un corpus real; se queda con la mejor de `rounds`
+    pasadas, alternando los parsers en cada una. Por defecto compara la
+    clasificacion de lineas vieja (parse_hand_baseline) con parse_hand, y
+    avisa si no dan lo mismo.
+    """
+    raws = load_raw_hands(folder, limit)
+    if not raws:
+        print("No hay manos en", folder)
+        return
+    n = len(raws)
+    ref = [parsers[-1][1](raw) for raw in raws]
+    best: Dict[str, float] = {}
+    for _ in range(rounds):
+        for name, parse in parsers:
+            dt = _best_of(1, lambda: deque((parse(raw) for raw in raws), 0))
+            best[name] = min(best.get(name, dt), dt)
+    for name, parse in parsers:
+        dt = best[name]
+        same = "" if [parse(raw) for raw in raws] == ref else "  (resultado distinto)"
+        print(f"{name}: {n} manos, {dt:.3f} s, {dt / n * 1e6:.1f} us/mano, {n / dt:.0f} manos/s{same}")
+    if len(parsers) > 1:
+        first, last = parsers[0][0], parsers[-1][0]
+        print(f"{last} vs {first}: x{best[first] / best[last]:.2f}")
+
+
+def _best_of(rounds: int, fn) -> float:
+    best = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def bench_binfmt(folder: Path, limit: int | None = None, rounds: int = 3) -> None:
+    """
+    Releer manos desde el archivo binario (HandStore) contra volver a
+    parsear el texto: tamano por mano y costo de decodificar, con y sin
+    add_stats, frente a parse_hand con y sin stats.
+
+    decode_compact (tuplas, lo que leen rebuild y stats_from_store) contra
+    parse_hand(stats=False) da entre x11 y x18 segun la corrida.
+    decode_hand arma los mismos dataclasses que parse_hand y queda en x5-x9:
+    ahi pesa armar los objetos, no leer el formato. Con stats las dos pagan
+    parse_stats y la diferencia baja a ~x3; en stats_from_store leer el
+    archivo es menos del 10%.
+    """
+    raws = load_raw_hands(folder, limit)
+    if not raws:
+        print("No hay manos en", folder)
+        return
+    n = len(raws)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "hands.bin"
+        store = HandStore(path)
+        for i, raw in enumerate(raws):
+            store.append(0, i, parse_hand(raw, stats=False))
+        store.close()
+        reader = StoreReader(path)
+        try:
+            size = path.stat().st_size
+            # sin guardar los resultados: medir el costo por mano, no el del gc
+            parse = _best_of(rounds, lambda: deque((parse_hand(r) for r in raws), 0))
+            parse_nostats = _best_of(rounds, lambda: deque((parse_hand(r, stats=False) for r in raws), 0))
+            decode = _best_of(rounds, lambda: deque(reader, 0))
+            compact = _best_of(rounds, lambda: deque(reader.compact(), 0))
+            decode_stats = _best_of(rounds, lambda: deque((add_stats(h) for _, _, h in reader), 0))
+            store_stats = _best_of(rounds, lambda: stats_from_store(reader))
+        finally:
+            reader.close()
+    text = sum(len(r) for r in raws)
+    print(f"binfmt: {n} manos, {size / n:.0f} bytes/mano (texto {text / n:.0f})")
+    for name, dt in (
+            ("parse_hand", parse),
+            ("parse_hand sin stats", parse_nostats),
+            ("decode", decode),
+            ("decode_compact", compact),
+            ("decode + add_stats", decode_stats),
+            ("stats_from_store", store_stats),
+    ):
+        print(f"  {name:<22} {dt / n * 1e6:7.1f} us/mano")
+    print(f"  decode_compact vs parse_hand sin stats: x{parse_nostats / compact:.1f}")
+    print(f"  decode vs parse_hand sin stats: x{parse_nostats / decode:.1f} (mismo HandData)")
+    # el resto es parse_stats y sumar las filas, igual que al importar
+    print(f"  stats_from_store: {compact / store_stats:.0%} es leer el archivo")
+
+
+def _db_bytes(db: DB) -> int:
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pages = db.conn.execute("PRAGMA page_count").fetchone()[0]
+    free = db.conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * db.conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def bench_actions(folder: Path, limit: int | None = None, batch: int = 2000) -> None:
+    """
+    Acciones en filas (actions) contra un BLOB por mano (hand_actions):
+    tiempo de insert_hands, tamano de la BD y costo de leer todas las
+    acciones (actions directo / v_actions).
+    """
+    raws = load_raw_hands(folder, limit)
+    hands = [h for h in (parse_hand(r) for r in raws) if h is not None]
+    if not hands:
+        print("No hay manos en", folder)
+        return
+    n = len(hands)
+    n_actions = sum(len(h.actions) for h in hands)
+    print(f"actions: {n} manos, {n_actions} acciones ({n_actions / n:.1f} por mano)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for packed in (False, True):
+            db = DB(Path(tmp) / f"packed{int(packed)}.sqlite3", packed_actions=packed)
+            try:
+                db.upsert_file("bench", 0.0, 0)
+                file_id, _ = db.get_file_state("bench")
+                t0 = time.perf_counter()
+                for i in range(0, n, batch):
+                    db.insert_hands([(file_id, h) for h in hands[i:i + batch]])
+                insert = time.perf_counter() - t0
+                size = _db_bytes(db)
+                table = "hand_actions" if packed else "actions"
+                read = _best_of(3, lambda: db.conn.execute(f"SELECT * FROM {table}").fetchall())
+                view = _best_of(3, lambda: db.conn.execute("SELECT * FROM v_actions").fetchall())
+            finally:
+                db.close()
+            print(f"  {'blob' if packed else 'filas':<6} insert {insert / n * 1e6:6.1f} us/mano  "
+                  f"BD {size / n:6.0f} bytes/mano  leer {table} {read:.3f} s  v_actions {view:.3f} s")
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 3:
+        print("uso: python -m app.bench parse|binfmt|actions <carpeta_hh> [limite]")
+        return 1
+    cmd, folder = argv[1], Path(argv[2])
+    limit = int(argv[3]) if len(argv) > 3 else None
+    if cmd == "parse":
+        bench_parse(folder, limit)
+        return 0
+    if cmd == "binfmt":
+        bench_binfmt(folder, limit)
+        return 0
+    if cmd == "actions":
+        bench_actions(folder, limit)
+        return 0
+    print("comando desconocido:", cmd)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterable, Optional, Set
+import sqlite3
+
+
+class PlayerIdCache:
+    """
+    Cache acotado player_name -> player_id (LRU).
+    Se precarga desde la tabla players al abrir la BD; mientras no haya
+    desalojado nada ("complete") un miss significa que el jugador es nuevo
+    y no hace falta preguntarle a SQLite.
+    """
+
+    def __init__(self, max_size: int = 500_000):
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self.complete = True
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def warm(self, conn: sqlite3.Connection) -> None:
+        self._ids.clear()
+        self.complete = True
+        cur = conn.execute(
+            "SELECT player_name, player_id FROM players ORDER BY player_id DESC LIMIT ?",
+            (self.max_size + 1,),
+        )
+        rows = cur.fetchall()
+        if len(rows) > self.max_size:
+            rows = rows[:self.max_size]
+            self.complete = False
+        # los mas recientes quedan al final (los ultimos en desalojarse)
+        for name, player_id in reversed(rows):
+            self._ids[name] = int(player_id)
+
+    def get(self, player_name: str) -> Optional[int]:
+        player_id = self._ids.get(player_name)
+        if player_id is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._ids.move_to_end(player_name)
+        return player_id
+
+    def put(self, player_name: str, player_id: int) -> None:
+        self._ids[player_name] = player_id
+        self._ids.move_to_end(player_name)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+            self.complete = False
+
+    def discard(self, player_names: Iterable[str]) -> None:
+        for name in player_names:
+            self._ids.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._ids),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class KnownHands:
+    """
+    Conjunto de hand_no ya importados, para descartar manos repetidas antes
+    de parsearlas. Los numeros viejos van en un array ordenado de int64
+    (8 bytes por mano, busqueda binaria) y los nuevos en un set chico que
+    se funde con el array cuando crece.
+    """
+
+    def __init__(self, merge_at: int = 100_000):
+        self.merge_at = merge_at
+        self._base = array("q")
+        self._recent: Set[int] = set()
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    def warm(self, conn: sqlite3.Connection) -> None:
+        self._base = array("q", (
+            int(row[0]) for row in conn.execute(
+                "SELECT CAST(hand_no AS INTEGER) FROM hands ORDER BY 1"
+            )
+        ))
+        self._recent = set()
+
+    def __contains__(self, hand_no: int) -> bool:
+        if hand_no in self._recent:
+            return True
+        i = bisect_left(self._base, hand_no)
+        return i < len(self._base) and self._base[i] == hand_no
+
+    def seen(self, hand_no: Optional[int]) -> bool:
+        """
+        True si la mano ya esta en la BD (y la cuenta como saltada).
+        """
+        if hand_no is None or hand_no not in self:
+            return False
+        self.skipped += 1
+        return True
+
+    def add_many(self, hand_nos: Iterable[int]) -> None:
+        self._recent.update(hand_nos)
+        if len(self._recent) >= self.merge_at:
+            self._base = array("q", sorted(chain(self._base, self._recent)))
+            self._recent = set()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from itertools import compress
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+import sqlite3
+
+# Bits de hand_player_facts.pre_flags / post_flags, en orden. Por mano cada
+# contador de PlayerStats vale 0 o 1, asi que entra en un bit. Los datos ya
+# guardados dependen de este orden: un contador nuevo va al final, nunca en
+# el medio (y cada columna tiene lugar hasta 63).
+PRE_FLAGS: Tuple[str, ...] = (
+    "rfi", "rfi_opp",
+    "cold_call", "cold_call_opp",
+    "three_bet", "three_bet_opp",
+    "fold_to_3bet", "fold_to_3bet_opp",
+    "call_vs_3bet", "call_vs_3bet_opp",
+    "four_bet", "four_bet_opp",
+    "squeeze", "squeeze_opp",
+    "steal", "steal_opp",
+    "foldbb_vs_steal", "foldbb_vs_steal_opp",
+)
+POST_FLAGS: Tuple[str, ...] = (
+    "saw_flop",
+    "c_bet", "c_bet_opp",
+    "fold_to_cbet", "fold_to_cbet_opp",
+    "check_raise_flop", "check_raise_flop_opp",
+    "donk_flop", "donk_flop_opp",
+    "saw_turn",
+    "barrel_turn", "barrel_turn_opp",
+    "fold_to_barrel_turn", "fold_to_barrel_turn_opp",
+    "saw_river",
+    "barrel_river", "barrel_river_opp",
+    "fold_to_barrel_river", "fold_to_barrel_river_opp",
+    "river_bet", "river_bet_opp",
+    "won_hand", "won_without_showdown",
+    "went_showdown", "won_showdown",
+)
+
+_get_pre = attrgetter(*PRE_FLAGS)
+_get_post = attrgetter(*POST_FLAGS)
+_PRE_BITS = [1 << bit for bit in range(len(PRE_FLAGS))]
+_POST_BITS = [1 << bit for bit in range(len(POST_FLAGS))]
+
+
+def pack_flags(st: Any) -> Tuple[int, int]:
+    """
+    PlayerStats de una mano -> (pre_flags, post_flags).
+    """
+    return sum(compress(_PRE_BITS, _get_pre(st))), sum(compress(_POST_BITS, _get_post(st)))
+
+
+def unpack_flags(pre_flags: int, post_flags: int) -> Dict[str, int]:
+    out = {name: (pre_flags >> bit) & 1 for bit, name in enumerate(PRE_FLAGS)}
+    out.update({name: (post_flags >> bit) & 1 for bit, name in enumerate(POST_FLAGS)})
+    return out
+
+
+@dataclass(slots=True)
+class FactFilter:
+    """
+    Filtro para fact_stats(); los campos en None no filtran.
+    since/until son timestamps (hand_ts) con until exclusivo.
+    opponents_of deja solo las manos donde estaba ese jugador, sin contarlo
+    a el: con player_id es "este rival contra mi", sin player_id son todos
+    los rivales juntos.
+    """
+    player_id: Optional[int] = None
+    since: Optional[int] = None
+    until: Optional[int] = None
+    stakes: Optional[str] = None
+    kind: Optional[str] = None  # 'cash' | 'tournament'
+    pos: Optional[str] = None
+    players_seated: Optional[int] = None
+    opponents_of: Optional[int] = None
+
+
+def _where(f: FactFilter) -> Tuple[str, List[Any]]:
+    conds: List[str] = []
+    params: List[Any] = []
+    if f.player_id is not None:
+        conds.append("player_id = ?")
+        params.append(f.player_id)
+    if f.since is not None:
+        conds.append("hand_ts >= ?")
+        params.append(f.since)
+    if f.until is not None:
+        conds.append("hand_ts < ?")
+        params.append(f.until)
+    if f.stakes is not None:
+        conds.append("stakes = ?")
+        params.append(f.stakes)
+    if f.kind is not None:
+        conds.append("is_tournament = ?")
+        params.append(1 if f.kind == "tournament" else 0)
+    if f.pos is not None:
+        conds.append("pos = ?")
+        params.append(f.pos)
+    if f.players_seated is not None:
+        conds.append("players_seated = ?")
+        params.append(f.players_seated)
+    if f.opponents_of is not None:
+        conds.append("player_id != ?")
+        conds.append("hand_id IN (SELECT hand_id FROM hand_player_facts WHERE player_id = ?)")
+        params += [f.opponents_of, f.opponents_of]
+    return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+
+def fact_stats(conn: sqlite3.Connection, f: FactFilter) -> Dict[str, int]:
+    """
+    Suma los contadores de PlayerStats sobre las filas que pasan el filtro.
+    SQLite solo agrupa por combinacion de flags (son pocas: cientos aunque
+    haya millones de filas) y los bits se suman aca, en vez de evaluar 43
+    expresiones por fila.
+    """
+    where, params = _where(f)
+    cur = conn.execute(
+        "SELECT pre_flags, post_flags, count(*) FROM hand_player_facts"
+        + where + " GROUP BY pre_flags, post_flags",
+        params,
+    )
+    pre_counts: Dict[int, int] = {}
+    post_counts: Dict[int, int] = {}
+    hands = 0
+    for pre, post, n in cur:
+        hands += n
+        pre_counts[pre] = pre_counts.get(pre, 0) + n
+        post_counts[post] = post_counts.get(post, 0) + n
+    out = {"hands": hands}
+    for flags_names, counts in ((PRE_FLAGS, pre_counts), (POST_FLAGS, post_counts)):
+        for bit, name in enumerate(flags_names):
+            mask = 1 << bit
+            out[name] = sum(n for flags, n in counts.items() if flags & mask)
+    return out
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import json
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+import sqlite3
+
+# Acciones de una mano empaquetadas en un solo BLOB (hand_actions.actions)
+# en vez de una fila por accion en actions: un INSERT por mano en lugar de
+# 10-20 filas con sus indices.
+#
+#   blob = _HEAD (cantidad de jugadores) + player_ids (_PID cada uno)
+#          + una _ACTION por accion, en orden (seq = posicion + 1)
+#
+# Cada accion referencia a su jugador por slot (indice en la lista de
+# player_ids del blob). Los montos son los mismos enteros que guarda
+# actions (unidades de hands.money_scale); None va como _NULL.
+_HEAD = struct.Struct("<B")
+_PID = struct.Struct("<I")
+_ACTION = struct.Struct("<BBbBiii")  # street, slot, accion, is_allin, amount, raise_from, raise_to
+_NULL = -2 ** 31
+
+# (street, player_id, action, amount, raise_from, raise_to, is_allin):
+# las columnas de actions sin hand_id ni seq
+ActionRow = Tuple[int, int, int, Optional[int], Optional[int], Optional[int], int]
+
+
+def _n(x: Optional[int]) -> int:
+    return _NULL if x is None else x
+
+
+def pack_actions(rows: Sequence[ActionRow]) -> bytes:
+    """
+    Filas de una mano -> blob. Lanza struct.error si un monto no entra en
+    32 bits (esa mano se guarda en actions, fila por fila).
+    """
+    slots: Dict[int, int] = {}
+    body: List[bytes] = []
+    for street, player_id, action, amount, raise_from, raise_to, is_allin in rows:
+        slot = slots.get(player_id)
+        if slot is None:
+            slot = slots[player_id] = len(slots)
+        body.append(_ACTION.pack(street, slot, action, is_allin, _n(amount), _n(raise_from), _n(raise_to)))
+    head = _HEAD.pack(len(slots)) + b"".join(_PID.pack(pid) for pid in slots)
+    return head + b"".join(body)
+
+
+def unpack_actions(blob: bytes) -> List[ActionRow]:
+    n = blob[0]
+    start = _HEAD.size + n * _PID.size
+    pids = [p for (p,) in _PID.iter_unpack(blob[_HEAD.size:start])]
+    return [
+        (
+            street, pids[slot], action,
+            None if amount == _NULL else amount,
+            None if raise_from == _NULL else raise_from,
+            None if raise_to == _NULL else raise_to,
+            is_allin,
+        )
+        for street, slot, action, is_allin, amount, raise_from, raise_to in _ACTION.iter_unpack(blob[start:])
+    ]
+
+
+def actions_json(blob: Optional[bytes]) -> Optional[str]:
+    """
+    Funcion SQL unpack_actions(blob): las acciones como arreglo JSON de
+    filas, para recorrerlas con json_each (ver la vista v_actions).
+    """
+    if blob is None:
+        return None
+    return json.dumps(unpack_actions(blob), separators=(",", ":"))
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """
+    Registra las funciones que usa la vista v_actions. Toda conexion que
+    consulte v_actions tiene que pasar por aca (el writer y el ReadPool lo
+    hacen al abrir); sin esto la vista da "no such function:
+    unpack_actions", este o no la BD en modo empaquetado.
+    """
+    conn.create_function("unpack_actions", 1, actions_json, deterministic=True)
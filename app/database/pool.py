@@ -0,0 +1,65 @@
+from __future__ import annotations
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+from .packed import register_functions
+
+
+class ReadPool:
+    """
+    Pool chico de conexiones de solo lectura a la misma BD. Con WAL cada
+    lector ve el ultimo COMMIT y no bloquea al writer (ni el writer a el),
+    asi que las consultas de stats de la UI corren mientras se importa.
+    Las conexiones se abren a demanda hasta `size` y se pueden usar desde
+    cualquier hilo (una por vez).
+    """
+
+    def __init__(self, db_path: str | Path, size: int = 2):
+        self._uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._uri, uri=True, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        register_functions(conn)  # v_actions
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Presta una conexion con una transaccion de lectura abierta: todas
+        las consultas del bloque ven la misma foto de la BD (nunca una
+        tanda de manos a medio escribir).
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._all) < self.size:
+                    conn = self._open()
+                    self._all.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+        self._idle = queue.LifoQueue()
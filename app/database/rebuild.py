@@ -0,0 +1,414 @@
+from __future__ import annotations
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import sqlite3
+
+from .db import DB, PLAYER_STATS_UPSERT_SQL, StatsAccumulator
+from .facts import pack_flags
+from .packed import unpack_actions
+from ..parser.binfmt import StoreReader
+from ..parser.classes import Action, HandData, PlayerResult, Post, Seat
+from ..parser.parse_hand import add_stats
+from ..parser.parse_stats import STATS_VERSION
+
+REBUILD_BATCH_HANDS = 5000
+STATE_NAME = "player_stats"
+# tabla viva -> tabla donde se arma la version nueva
+STAGES = {
+    "player_stats": "player_stats_rebuild",
+    "hand_player_facts": "hand_player_facts_rebuild",
+}
+
+_STAGE_UPSERT_SQL = PLAYER_STATS_UPSERT_SQL.replace(
+    "INSERT INTO player_stats", "INSERT INTO " + STAGES["player_stats"], 1
+)
+_STAGE_FACTS_SQL = f"""
+    INSERT OR REPLACE INTO {STAGES["hand_player_facts"]}(
+    player_id, hand_ts, hand_id, stakes, is_tournament,
+    pos, players_seated, stack_bb_bucket, pre_flags, post_flags
+    ) VALUES(?,?,?,?,?,?,?,?,?,?)
+"""
+
+# Manos guardadas antes de que existiera el rebuild: no tienen filas en
+# result y los posts se guardaban con int() (ciegas de centavos = 0). Con
+# eso parse_stats da won_showdown 0 y stack_bb_bucket NULL, asi que no se
+# recalculan.
+_LEGACY_HANDS_SQL = """
+    SELECT count(*) FROM hands h
+    WHERE NOT EXISTS (SELECT 1 FROM result r WHERE r.hand_id = h.id)
+       OR EXISTS (SELECT 1 FROM posts p WHERE p.hand_id = h.id AND p.amount = 0)
+"""
+
+# (hand_id, max_seats, btn_pos, stakes, is_tournament, hand_ts,
+#  seats, posts, actions, results): lo justo para parse_position + parse_stats
+CompactHand = Tuple[int, int, int, Optional[str], int, int, list, list, list, list]
+
+
+def _grouped(cur: sqlite3.Cursor) -> Dict[int, List[tuple]]:
+    out: Dict[int, List[tuple]] = {}
+    for row in cur:
+        rows = out.get(row[0])
+        if rows is None:
+            rows = out[row[0]] = []
+        rows.append(row[1:])
+    return out
+
+
+def load_batch(
+        conn: sqlite3.Connection, after_id: int, limit: int, store: Optional[StoreReader] = None,
+) -> List[CompactHand]:
+    """
+    Las siguientes `limit` manos con id > after_id, armadas desde hands,
+    seats, posts, actions (o hand_actions) y result (una consulta por tabla
+    para todo el lote).
+
+    Con store (el archivo de HandStore) cada mano sale de su copia binaria
+    y los nombres se pasan a player_id con una sola consulta a players; las
+    tablas de la mano se leen solo para las que no estan en el archivo.
+    """
+    cur = conn.cursor()
+    cur.row_factory = None
+    hands = cur.execute(
+        "SELECT id, max_seats, btn_pos, stakes, kind, hand_ts, hand_no FROM hands "
+        "WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, limit),
+    ).fetchall()
+    if not hands:
+        return []
+    rng = (hands[0][0], hands[-1][0])
+    stored = _from_store(cur, store, hands, rng) if store is not None else {}
+    if len(stored) < len(hands):
+        seats, posts, actions, results = _from_tables(cur, rng)
+    else:
+        seats = posts = actions = results = {}
+    out: List[CompactHand] = []
+    for hand_id, max_seats, btn_pos, stakes, kind, hand_ts, _ in hands:
+        hand = stored.get(hand_id)
+        if hand is None:
+            hand = (
+                hand_id, max_seats, btn_pos, stakes, 1 if kind == "tournament" else 0, hand_ts,
+                seats.get(hand_id, []), posts.get(hand_id, []),
+                actions.get(hand_id, []), results.get(hand_id, []),
+            )
+        out.append(hand)
+    return out
+
+
+def _from_tables(cur: sqlite3.Cursor, rng: Tuple[int, int]) -> Tuple[dict, dict, dict, dict]:
+    seats = _grouped(cur.execute(
+        "SELECT hand_id, pos, player_id, chips, sitting_out FROM seats "
+        "WHERE hand_id BETWEEN ? AND ? ORDER BY hand_id, pos", rng))
+    posts = _grouped(cur.execute(
+        "SELECT hand_id, player_id, kind, amount FROM posts "
+        "WHERE hand_id BETWEEN ? AND ? ORDER BY hand_id, rowid", rng))
+    actions = _grouped(cur.execute(
+        "SELECT hand_id, street, player_id, action FROM actions "
+        "WHERE hand_id BETWEEN ? AND ? ORDER BY hand_id, seq", rng))
+    for hand_id, blob in cur.execute(
+            "SELECT hand_id, actions FROM hand_actions WHERE hand_id BETWEEN ? AND ?", rng):
+        actions[hand_id] = [(street, pid, action) for street, pid, action, *_ in unpack_actions(blob)]
+    results = _grouped(cur.execute(
+        "SELECT hand_id, player_id, collected FROM result "
+        "WHERE hand_id BETWEEN ? AND ?", rng))
+    return seats, posts, actions, results
+
+
+def _from_store(cur: sqlite3.Cursor, store: StoreReader, hands: List[tuple], rng: Tuple[int, int]) -> Dict[int, CompactHand]:
+    # hand_id -> CompactHand armado desde el archivo binario; una mano que
+    # falta en el archivo (o con un jugador que no esta en players) no sale
+    found = []
+    for hand_id, _, _, _, _, hand_ts, hand_no in hands:
+        c = store.get_compact(hand_no)
+        if c is not None:
+            found.append((hand_id, hand_ts, c))
+    if not found:
+        return {}
+    ids = dict(cur.execute(
+        "SELECT p.player_name, p.player_id FROM players p WHERE p.player_id IN "
+        "(SELECT player_id FROM seats WHERE hand_id BETWEEN ? AND ?)", rng))
+    out: Dict[int, CompactHand] = {}
+    for hand_id, hand_ts, (_, max_seats, btn_pos, stakes, is_tournament, _, seats, posts, actions, results) in found:
+        try:
+            out[hand_id] = (
+                hand_id, max_seats, btn_pos, stakes, is_tournament, hand_ts,
+                [(pos, ids[name], chips, sitting_out) for pos, name, chips, sitting_out in seats],
+                [(ids[name], kind, amount) for name, kind, amount in posts],
+                [(street, ids[name], action) for street, name, action in actions],
+                [(ids[name], collected) for name, collected in results],
+            )
+        except KeyError:
+            continue
+    return out
+
+
+def _is_legacy(posts: list, results: list) -> bool:
+    # misma condicion que _LEGACY_HANDS_SQL
+    return not results or any(amount == 0 for _, _, amount in posts)
+
+
+def compute_batch(batch: List[CompactHand]) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Corre parse_position + parse_stats sobre un lote (en un worker o aca).
+    Los jugadores van por player_id en vez de nombre. Devuelve las filas de
+    player_stats (ya sumadas por clave) y las de hand_player_facts. Las
+    manos viejas (ver _LEGACY_HANDS_SQL) se saltean.
+    """
+    stats = StatsAccumulator()
+    fact_rows: List[tuple] = []
+    for hand_id, max_seats, btn_pos, stakes, is_tournament, hand_ts, seats, posts, actions, results in batch:
+        if _is_legacy(posts, results):
+            continue
+        hand = HandData(
+            hand_id=None, tournament_id=None, buy_in=None, stakes=stakes, cur=None,
+            local_dt=None, local_tz=None, max_seats=max_seats, button_pos=btn_pos,
+            players_seated=len(seats),
+        )
+        hand.seats = [
+            # en BDs viejas seats.chips es "None" (texto) si la linea no traia fichas
+            Seat(pos=pos, player_name=pid, chips=chips if isinstance(chips, (int, float)) else None,
+                 sitting_out=bool(sitting_out))
+            for pos, pid, chips, sitting_out in seats
+        ]
+        hand.posts = [Post(player_name=pid, kind=kind, amount=amount) for pid, kind, amount in posts]
+        hand.actions = [Action(street=street, player_name=pid, action=action) for street, pid, action in actions]
+        hand.results = [PlayerResult(player_name=pid, collected=collected) for pid, collected in results]
+        add_stats(hand)
+        for pid, st in hand.stats.items():
+            stats.add(pid, st)
+            pre_flags, post_flags = pack_flags(st)
+            fact_rows.append((
+                pid, hand_ts, hand_id, stakes, is_tournament,
+                st.position, st.players_at_table, st.stack_bucket,
+                pre_flags, post_flags,
+            ))
+    return stats.rows(), fact_rows
+
+
+def stats_from_store(store: StoreReader, batch_hands: int = REBUILD_BATCH_HANDS) -> List[tuple]:
+    """
+    Filas de player_stats de todas las manos del archivo binario, sin BD ni
+    regex: para probar un cambio en parse_stats contra un corpus ya
+    importado. Los jugadores van por nombre en vez de player_id.
+    """
+    totals: Dict[tuple, list] = {}
+
+    def merge(rows: List[tuple]) -> None:
+        for row in rows:
+            key = (row[0], row[1], row[3], row[4])
+            acc = totals.get(key)
+            if acc is None:
+                totals[key] = list(row)
+                continue
+            acc[2] = row[2]
+            for i in range(5, len(row)):
+                acc[i] += row[i]
+
+    batch: List[CompactHand] = []
+    for _, _, hand in store.compact():
+        # hand_no y local_dt quedan donde van hand_id y hand_ts: solo los
+        # usan las filas de hand_player_facts, que aca se descartan
+        batch.append(hand)
+        if len(batch) >= batch_hands:
+            merge(compute_batch(batch)[0])
+            batch = []
+    if batch:
+        merge(compute_batch(batch)[0])
+    return [tuple(r) for r in totals.values()]
+
+
+def _start(db: DB, restart: bool, skip_legacy: bool) -> int:
+    conn = db.conn
+    row = conn.execute(
+        "SELECT last_hand_id FROM rebuild_state WHERE name = ?", (STATE_NAME,)
+    ).fetchone()
+    staged = {
+        r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN (?, ?)", tuple(STAGES.values())
+        )
+    }
+    if row is not None and not restart and staged == set(STAGES.values()):
+        print(f"rebuild: sigue despues de la mano {row[0]}")
+        return int(row[0])
+    legacy = conn.execute(_LEGACY_HANDS_SQL).fetchone()[0]
+    if legacy:
+        if not skip_legacy:
+            raise RuntimeError(
+                f"rebuild: {legacy} manos se guardaron con una version anterior (sin result o con "
+                "posts truncados) y no se pueden recalcular. Reimportar esos archivos, o correr con "
+                "skip_legacy (--skip-legacy) para dejarlas afuera de player_stats y hand_player_facts."
+            )
+        print(f"rebuild: se saltean {legacy} manos guardadas con una version anterior")
+    with db.transaction():
+        for table, stage in STAGES.items():
+            conn.execute(f"DROP TABLE IF EXISTS {stage}")
+            sql = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name = ?", (table,)
+            ).fetchone()[0]
+            stage_sql = sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE {stage}", 1)
+            if stage_sql == sql:
+                raise RuntimeError(f"rebuild: no se pudo copiar el esquema de {table}")
+            conn.execute(stage_sql)
+        total = conn.execute("SELECT value FROM counters WHERE name = 'hands'").fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO rebuild_state(name, last_hand_id, total_hands, started_at) VALUES(?,?,?,?)",
+            (STATE_NAME, 0, total, time.time()),
+        )
+    return 0
+
+
+def _apply(db: DB, last_hand_id: int, stat_rows: List[tuple], fact_rows: List[tuple]) -> None:
+    # el lote y el avance en la misma transaccion: cortar en cualquier
+    # punto deja la staging consistente con last_hand_id
+    with db.transaction() as conn:
+        if stat_rows:
+            conn.executemany(_STAGE_UPSERT_SQL, stat_rows)
+        if fact_rows:
+            conn.executemany(_STAGE_FACTS_SQL, fact_rows)
+        conn.execute(
+            "UPDATE rebuild_state SET last_hand_id = ? WHERE name = ?", (last_hand_id, STATE_NAME)
+        )
+
+
+def _batches(
+        conn: sqlite3.Connection, after_id: int, batch_hands: int, store: Optional[StoreReader] = None,
+) -> Iterator[List[CompactHand]]:
+    while True:
+        batch = load_batch(conn, after_id, batch_hands, store)
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1][0]
+
+
+def _swap(db: DB, batch_hands: int, store: Optional[StoreReader]) -> None:
+    conn = db.conn
+    with db.transaction():
+        # primero una escritura: toma el lock de escritura antes de leer, asi
+        # ningun otro proceso puede meter manos entre el ultimo lote y el swap
+        conn.execute("UPDATE rebuild_state SET started_at = started_at WHERE name = ?", (STATE_NAME,))
+        last = conn.execute(
+            "SELECT last_hand_id FROM rebuild_state WHERE name = ?", (STATE_NAME,)
+        ).fetchone()[0]
+        # manos importadas mientras corria el rebuild
+        for batch in _batches(conn, last, batch_hands, store):
+            _apply(db, batch[-1][0], *compute_batch(batch))
+        for table, stage in STAGES.items():
+            indexes = [
+                r[0] for r in conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name = ? AND sql IS NOT NULL",
+                    (table,),
+                )
+            ]
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {stage} RENAME TO {table}")
+            for sql in indexes:
+                conn.execute(sql)
+        conn.execute("DELETE FROM rebuild_state WHERE name = ?", (STATE_NAME,))
+        conn.execute("UPDATE counters SET value = ? WHERE name = 'stats_version'", (STATS_VERSION,))
+
+
+def rebuild_player_stats(
+        db: DB,
+        workers: Optional[int] = 1,
+        batch_hands: int = REBUILD_BATCH_HANDS,
+        restart: bool = False,
+        skip_legacy: bool = False,
+        store: Optional[StoreReader] = None,
+) -> int:
+    """
+    Recalcula player_stats y hand_player_facts desde las tablas guardadas
+    (hands, seats, posts, actions, result) sin releer los archivos: sirve
+    despues de corregir una definicion en parse_stats.
+
+    Las tablas nuevas se arman aparte (*_rebuild) por lotes de manos; cada
+    lote se commitea junto con su avance en rebuild_state, asi que si se
+    corta, la proxima llamada sigue desde el ultimo lote (restart=True
+    empieza de cero). Al final, en una sola transaccion, se procesan las
+    manos que hayan entrado mientras tanto y las tablas nuevas reemplazan a
+    las viejas; hasta ese COMMIT los lectores siguen viendo las anteriores.
+
+    Con workers > 1, parse_stats corre en un pool de procesos; este proceso
+    lee los lotes de la BD y es el unico que escribe.
+
+    Con store (StoreReader del archivo de HandStore) las manos se leen de su
+    copia binaria en vez de las tablas seats/posts/actions/result.
+
+    Si hay manos guardadas por una version anterior (sin result, posts
+    truncados) lanza RuntimeError antes de tocar nada: recalcularlas
+    borraria datos. Con skip_legacy=True esas manos quedan afuera de las
+    tablas nuevas.
+    Al terminar deja stats_version (counters) en STATS_VERSION.
+    Devuelve la cantidad de manos leidas.
+    """
+    workers = workers or os.cpu_count() or 1
+    conn = db.conn
+    last = _start(db, restart, skip_legacy)
+    total = conn.execute(
+        "SELECT total_hands FROM rebuild_state WHERE name = ?", (STATE_NAME,)
+    ).fetchone()[0]
+    done = 0
+    t0 = last_print = time.perf_counter()
+
+    def report(n: int) -> None:
+        nonlocal done, last_print
+        done += n
+        now = time.perf_counter()
+        if now - last_print >= 2.0:
+            last_print = now
+            print(f"rebuild: {done} manos ({done / (now - t0):.0f} manos/s, ~{total} en la BD)")
+
+    batches = _batches(conn, last, batch_hands, store)
+    if workers <= 1:
+        for batch in batches:
+            _apply(db, batch[-1][0], *compute_batch(batch))
+            report(len(batch))
+    else:
+        # ventana acotada de lotes en vuelo, en orden de hand_id (como _run_ranges)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: Deque[Tuple[int, int, Future]] = deque()
+            for batch in batches:
+                pending.append((batch[-1][0], len(batch), pool.submit(compute_batch, batch)))
+                if len(pending) >= workers * 2:
+                    hi, n, fut = pending.popleft()
+                    _apply(db, hi, *fut.result())
+                    report(n)
+            while pending:
+                hi, n, fut = pending.popleft()
+                _apply(db, hi, *fut.result())
+                report(n)
+    _swap(db, batch_hands, store)
+    dt = time.perf_counter() - t0
+    print(f"rebuild: listo, {done} manos en {dt:.1f} s")
+    return done
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 2:
+        print("uso: python -m app.database.rebuild <bd> [workers] [--restart] [--skip-legacy] [--store=<archivo>]")
+        return 1
+    args = [a for a in argv[2:] if not a.startswith("--")]
+    workers = int(args[0]) if args else 1
+    store_path = next((a.split("=", 1)[1] for a in argv[2:] if a.startswith("--store=")), None)
+    db = DB(argv[1])
+    store = StoreReader(store_path) if store_path else None
+    try:
+        rebuild_player_stats(
+            db, workers=workers, restart="--restart" in argv, skip_legacy="--skip-legacy" in argv,
+            store=store,
+        )
+    except RuntimeError as e:
+        print(e)
+        return 1
+    finally:
+        if store is not None:
+            store.close()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,84 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+from .db import DB
+from ..parser.binfmt import HandStore
+
+
+class HandWriter:
+    """
+    Write-behind de manos: acumula (file_id, HandData) y los escribe con
+    DB.insert_hands cada max_hands manos o cuando la mano mas vieja del
+    buffer lleva max_latency_ms esperando. Los deltas de player_stats se
+    suman por clave (StatsAccumulator) y se escriben en la misma
+    transaccion que las manos, asi un corte nunca pierde ni duplica stats.
+    Si se le pasan offsets, el checkpoint de cada archivo (files.last_offset)
+    tambien va en esa transaccion.
+    Con store, cada mano que llega con end_offset se agrega tambien al
+    archivo binario (HandStore), recien despues del COMMIT.
+    """
+
+    def __init__(
+            self,
+            db: DB,
+            max_hands: int = 2000,
+            max_latency_ms: int = 500,
+            store: Optional[HandStore] = None,
+    ):
+        self.db = db
+        self.store = store
+        self.max_hands = max_hands
+        self.max_latency_ms = max_latency_ms
+        self._pending: List[Tuple[int, Any]] = []
+        self._offsets: Dict[int, int] = {}
+        # (file_id, end_offset, hand) que van al store con el proximo COMMIT
+        self._to_store: List[Tuple[int, int, Any]] = []
+        self._oldest_ts = 0.0
+        self.inserted = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, file_id: int, hand: Any, end_offset: Optional[int] = None) -> int:
+        if not self._pending:
+            self._oldest_ts = time.monotonic()
+        self._pending.append((file_id, hand))
+        if end_offset is not None:
+            self._offsets[file_id] = end_offset
+            if self.store is not None:
+                self._to_store.append((file_id, end_offset, hand))
+        return self.poll()
+
+    def checkpoint(self, file_id: int, end_offset: int) -> None:
+        """
+        Avanza el offset de un archivo sin mano (p.ej. una mano ya importada):
+        se guarda con el proximo flush.
+        """
+        self._offsets[file_id] = end_offset
+
+    def poll(self) -> int:
+        """
+        Escribe el buffer si se paso alguno de los dos limites.
+        Devuelve la cantidad de manos nuevas insertadas.
+        """
+        if not self._pending:
+            return 0
+        age_ms = (time.monotonic() - self._oldest_ts) * 1000.0
+        if len(self._pending) >= self.max_hands or age_ms >= self.max_latency_ms:
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        if not self._pending and not self._offsets:
+            return 0
+        inserted = len(self.db.insert_hands(self._pending, offsets=list(self._offsets.items())))
+        if self._to_store:
+            for file_id, end_offset, hand in self._to_store:
+                self.store.append(file_id, end_offset, hand)
+            self.store.flush()
+        self._pending = []
+        self._offsets = {}
+        self._to_store = []
+        self.inserted += inserted
+        return inserted
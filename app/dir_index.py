@@ -0,0 +1,225 @@
+from __future__ import annotations
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@dataclass(slots=True)
+class FileEntry:
+    size: int
+    mtime: float
+    inode: int
+
+
+@dataclass(slots=True)
+class _DirState:
+    mtime_ns: int
+    files: Set[str] = field(default_factory=set)
+    subdirs: Set[str] = field(default_factory=set)
+
+
+class DirectoryIndex:
+    """
+    Indice en memoria de los .txt de una carpeta (y sus subcarpetas) que
+    dura entre pasadas del importer. Guarda size/mtime/inode por archivo y
+    el mtime de cada directorio:
+
+    - un directorio solo se relista (os.scandir) si cambio su mtime, es
+      decir si se crearon, borraron o renombraron entradas; de lo que ya
+      estaba solo se mira el inode (d_ino, gratis en scandir).
+    - los archivos "calientes" (mtime dentro del cutoff) se stat-ean en
+      cada pasada, porque escribir en un archivo no cambia su directorio.
+    - el resto (tier frio) solo se revisa en el barrido completo, cada
+      cold_rescan_seconds.
+
+    Asi el costo de cada pasada sigue a la cantidad de mesas activas y no
+    al tamano del archivo historico.
+    """
+
+    def __init__(self, root: str | Path, suffix: str = ".txt", cold_rescan_seconds: float = 600.0):
+        self.root = Path(root)
+        self.suffix = suffix.lower()
+        self.cold_rescan_seconds = cold_rescan_seconds
+        self._files: Dict[str, FileEntry] = {}
+        self._dirs: Dict[str, _DirState] = {}
+        self._hot: Set[str] = set()
+        self._last_full = 0.0
+        self._sorted: Optional[List[str]] = None
+        self._changed: List[str] = []
+        # contadores para ver cuanto trabajo hace cada pasada
+        self.full_scans = 0
+        self.dir_scans = 0
+        self.stats = 0
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def get(self, path_str: str) -> Optional[FileEntry]:
+        return self._files.get(path_str)
+
+    def refresh(self, hot_cutoff: float = 0.0, now: Optional[float] = None) -> List[str]:
+        """
+        Pone el indice al dia. hot_cutoff es el mtime a partir del cual un
+        archivo se considera activo (now - window_seconds en el importer;
+        con inf no hay tier caliente). Devuelve los archivos nuevos o cuyo
+        size/mtime cambio en esta pasada.
+        """
+        now = time.time() if now is None else now
+        self._changed = []
+        if not self._dirs or now - self._last_full >= self.cold_rescan_seconds:
+            self._full_scan(hot_cutoff)
+            self._last_full = now
+            return self._changed
+        for dir_str in list(self._dirs):
+            state = self._dirs.get(dir_str)
+            if state is None:  # se fue con un padre borrado en esta misma pasada
+                continue
+            try:
+                mtime_ns = os.stat(dir_str).st_mtime_ns
+            except FileNotFoundError:
+                self._drop_dir(dir_str)
+                continue
+            if mtime_ns != state.mtime_ns:
+                self._scan_dir(dir_str, mtime_ns, hot_cutoff, force=False)
+        for path_str in list(self._hot):
+            try:
+                st = os.stat(path_str)
+            except FileNotFoundError:
+                continue  # lo saca el scandir del directorio
+            self.stats += 1
+            self._update(path_str, st, hot_cutoff)
+        return self._changed
+
+    def paths(self) -> List[Path]:
+        if self._sorted is None:
+            self._sorted = sorted(self._files)
+        return [Path(p) for p in self._sorted]
+
+    def recent(self, cutoff: float) -> List[Tuple[str, float, int]]:
+        """
+        (path, mtime, size) de los archivos con mtime >= cutoff, del mas
+        nuevo al mas viejo.
+        """
+        out = [
+            (p, e.mtime, e.size)
+            for p, e in self._files.items()
+            if e.mtime >= cutoff
+        ]
+        out.sort(key=lambda x: x[1], reverse=True)
+        return out
+
+    def _full_scan(self, hot_cutoff: float) -> None:
+        self.full_scans += 1
+        if not self.root.is_dir():
+            self._files.clear()
+            self._dirs.clear()
+            self._hot.clear()
+            self._sorted = None
+            return
+        root_str = str(self.root)
+        seen_dirs: Set[str] = set()
+        stack = [root_str]
+        while stack:
+            dir_str = stack.pop()
+            try:
+                mtime_ns = os.stat(dir_str).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs.add(dir_str)
+            self._scan_dir(dir_str, mtime_ns, hot_cutoff, force=True, recurse=False)
+            stack.extend(self._dirs[dir_str].subdirs)
+        for dir_str in [d for d in self._dirs if d not in seen_dirs]:
+            self._drop_dir(dir_str)
+
+    def _scan_dir(self, dir_str: str, mtime_ns: int, hot_cutoff: float,
+                  force: bool, recurse: bool = True) -> None:
+        """
+        Relista un directorio. Con force (barrido completo) se stat-ean
+        todos los archivos; si no, solo los nuevos o con otro inode.
+        """
+        self.dir_scans += 1
+        state = self._dirs.get(dir_str)
+        if state is None:
+            state = self._dirs[dir_str] = _DirState(mtime_ns)
+        state.mtime_ns = mtime_ns
+        files: Set[str] = set()
+        subdirs: Set[str] = set()
+        try:
+            it = os.scandir(dir_str)
+        except FileNotFoundError:
+            self._drop_dir(dir_str)
+            return
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(self.suffix) or not entry.is_file():
+                        continue
+                    path_str = entry.path
+                    files.add(path_str)
+                    known = self._files.get(path_str)
+                    inode = entry.inode()
+                    if force or known is None or known.inode != inode:
+                        self.stats += 1
+                        self._update(path_str, entry.stat(), hot_cutoff, inode)
+                except FileNotFoundError:
+                    continue  # se borro mientras listabamos
+        for path_str in state.files - files:
+            self._files.pop(path_str, None)
+            self._hot.discard(path_str)
+            self._sorted = None
+        for sub in state.subdirs - subdirs:
+            self._drop_dir(sub)
+        state.files = files
+        state.subdirs = subdirs
+        if recurse:
+            for sub in subdirs:
+                if sub not in self._dirs:
+                    try:
+                        sub_mtime = os.stat(sub).st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+                    self._scan_dir(sub, sub_mtime, hot_cutoff, force=True)
+
+    def _update(self, path_str: str, st: os.stat_result, hot_cutoff: float,
+                inode: Optional[int] = None) -> None:
+        entry = self._files.get(path_str)
+        if entry is None:
+            self._files[path_str] = entry = FileEntry(-1, 0.0, 0)
+            self._sorted = None
+        size, mtime = int(st.st_size), float(st.st_mtime)
+        if size != entry.size or mtime != entry.mtime:
+            self._changed.append(path_str)
+        entry.size = size
+        entry.mtime = mtime
+        # en Windows DirEntry.stat() trae st_ino en 0: se usa el de entry.inode()
+        entry.inode = int(st.st_ino) if inode is None else inode
+        if entry.mtime >= hot_cutoff:
+            self._hot.add(path_str)
+        else:
+            self._hot.discard(path_str)
+
+    def _drop_dir(self, dir_str: str) -> None:
+        state = self._dirs.pop(dir_str, None)
+        if state is None:
+            return
+        for path_str in state.files:
+            self._files.pop(path_str, None)
+            self._hot.discard(path_str)
+        self._sorted = None
+        for sub in state.subdirs:
+            self._drop_dir(sub)
+
+
+def list_txt_files(folder: str | Path) -> List[Path]:
+    """
+    Todos los .txt de la carpeta y sus subcarpetas, ordenados (un solo
+    barrido con scandir).
+    """
+    index = DirectoryIndex(folder)
+    index.refresh()
+    return index.paths()
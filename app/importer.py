@@ -1,12 +1,20 @@
 from __future__ import annotations
 import os
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Tuple, Dict, List
+from typing import Optional, Tuple, Dict, List, Callable, Deque
 import re
 
 from .database.db import DB
+from .parser.parse_hand import parse_hand
+from .parser.classes import HandData
+from .parser.binfmt import HandStore
+from .parser.split import HAND_MARK, split_hands, iter_hand_views, hand_no_of
+from .watcher import FolderWatcher
+from .dir_index import DirectoryIndex
+from .scheduler import TailScheduler
 
 
 HAND_START_RE = re.compile(rb"""
@@ -43,23 +51,54 @@ HOLE_CARDS = re.compile(rb"""
                     re.VERBOSE)
 
 
+HAND_START_PREFIXES = (b"\xef\xbb\xbfPokerStars Hand", b"PokerStars Hand")
+# bytes por lectura en _process_growth (~4k manos)
+READ_CHUNK = 4 * 1024 * 1024
+# una mano sin terminar nunca ocupa tanto: un carry mas grande se descarta
+MAX_CARRY = 1024 * 1024
+# bloques por visita de una mesa en juego; si queda mas se sigue en el proximo tick
+LIVE_MAX_CHUNKS = 1
+# cada cuanto se busca en la carpeta archivos nuevos o que volvieron a crecer (sin watchdog)
+DISCOVERY_SECONDS = 1.0
+# el historial se lee de a bloques chicos (~250 manos) para no frenar al carril en vivo
+BULK_CHUNK = 256 * 1024
+# tiempo minimo por tick para el historial cuando no hay mesas en vivo ocupando el writer
+BULK_SLICE_SECONDS = 0.1
+
+
 def find_hand_starts(data:bytes) -> List[int]:
     return [m.start() for m in HAND_START_RE.finditer(data)]
 
 
-def split_complete_hands(buffer_bytes: bytes) -> Tuple[List[bytes], bytes]:
-    starts = find_hand_starts(buffer_bytes)
-    if len(starts) < 2:
-        return [], buffer_bytes #no hay manos
-    hands : List[bytes] = []
-    ranges = zip(starts, starts[1:])
-    for a, b in ranges:
-        chunk = buffer_bytes[a:b]
-        if chunk.strip():
-            hands.append(chunk)
-    lastStart = starts[-1]
-    carry = buffer_bytes[lastStart:] #ultima mano buffer[last:]
-    return hands, carry
+def split_complete_hands(buffer_bytes: bytes) -> Tuple[List[memoryview], bytes]:
+    # busqueda de bytes de b"\nPokerStars Hand #", sin regex ni copias por mano
+    return split_hands(buffer_bytes)
+
+def _carry_junk(buf: bytes, carry_from: int) -> int:
+    """
+    Bytes del principio de buf[carry_from:] que se descartan: lo que hay
+    antes de la primera mano y, si el carry pasa MAX_CARRY, todo (ninguna
+    mano es tan larga: no es una mano a medio escribir). Sin esto un .txt
+    que no es de manos agranda el carry sin limite.
+    """
+    size = len(buf) - carry_from
+    if size <= MAX_CARRY:
+        return 0
+    if buf.startswith(HAND_START_PREFIXES, carry_from):
+        return size
+    i = buf.find(HAND_MARK, carry_from)
+    if i == -1 or len(buf) - (i + 1) > MAX_CARRY:
+        return size
+    return i + 1 - carry_from
+
+
+def hand_is_complete(raw: bytes) -> bool:
+    """
+    La mano ya tiene su SUMMARY y termino en linea en blanco: PokerStars
+    escribe la mano entera y despues las lineas vacias, asi que no hace
+    falta esperar idle_flush_seconds para darla por cerrada.
+    """
+    return b"*** SUMMARY ***" in raw and (raw.endswith(b"\n\n") or raw.endswith(b"\n\r\n"))
 
 def extract_hand_no(raw_hand:bytes) -> Optional[str]:
     for pref in HAND_START_PREFIXES:
@@ -85,6 +124,29 @@ def extract_hand_no(raw_hand:bytes) -> Optional[str]:
 class FileRuntimeState:
     carry: bytes = b""
     last_change_ts : float = 0.0 
+    file_id: int = 0
+    # bytes leidos del archivo; files.last_offset queda en el inicio del carry
+    read_offset: int = 0
+
+@dataclass
+class LaneStats:
+    depth: int = 0
+    hands: int = 0
+    # espera (media movil) entre que un archivo entra a la cola y se atiende/termina
+    latency_ms: float = 0.0
+
+    def observe(self, wait_seconds: float) -> None:
+        ms = wait_seconds * 1000.0
+        self.latency_ms = ms if self.latency_ms == 0.0 else 0.8 * self.latency_ms + 0.2 * ms
+
+@dataclass
+class ImportProgress:
+    hands_imported: int = 0
+    files_pending: int = 0
+    hands_per_second: float = 0.0
+    # carril en vivo (mesas dentro de window_seconds) y carril del historial
+    live: LaneStats = field(default_factory=LaneStats)
+    bulk: LaneStats = field(default_factory=LaneStats)
 
 class HandHistoryImporter:
     def __init__(
@@ -93,112 +155,361 @@ class HandHistoryImporter:
             folder: str | Path,
             window_seconds: int = 300,
             idle_flush_seconds: int = 3,
+            watch: bool = False,
+            debounce_ms: int = 30,
+            fallback_poll_seconds: int = 60,
+            cold_rescan_seconds: int = 600,
+            hot_seconds: int = 4 * 3600,
+            tail_min_interval: float = 0.25,
+            tail_max_interval: float = 2.0,
+            bulk_share: float = 0.25,
+            on_progress: Optional[Callable[[ImportProgress], None]] = None,
+            hand_store: Optional[HandStore] = None,
     ):
         self._bootstrapped = False
         self.db = db
+        # Archivo binario con las manos parseadas (opcional, ver binfmt)
+        self.hand_store = hand_store
         self.folder = Path(folder)
         self.window_seconds = window_seconds
         self.idle_flush_seconds = idle_flush_seconds
         self.runtime: Dict[str, FileRuntimeState] = {}
-    
-    def _list_txt_files(self) -> List[Path]:
-        if not self.folder.exists():
-            return []
-        files: List[Path] = []
-        for p in self.folder.glob("*.txt"):
-            if p.is_file():
-                files.append(p)
-        return sorted(files)
+        # Indice de la carpeta entre pasadas: solo se stat-ean los archivos activos
+        self.index = DirectoryIndex(self.folder, cold_rescan_seconds=cold_rescan_seconds)
+        # tier caliente del indice: archivos tocados en las ultimas hot_seconds.
+        # Es mas largo que window_seconds para que una mesa que el scheduler
+        # dio por dormida y vuelve a escribir se vea en DISCOVERY_SECONDS y
+        # no en el proximo barrido completo
+        self.hot_seconds = max(hot_seconds, window_seconds)
+        # Cuando mirar cada archivo activo (y cuando vence su carry)
+        self.scheduler = TailScheduler(tail_min_interval, tail_max_interval, dormant_seconds=window_seconds)
+        # Historial pendiente (path, cuando se encolo); recibe al menos bulk_share del writer
+        self._bulk: Deque[Tuple[str, float]] = deque()
+        self.bulk_share = bulk_share
+        # Modo por eventos: si watchdog no arranca se queda en polling
+        self.watcher: Optional[FolderWatcher] = FolderWatcher(self.folder, debounce_ms) if watch else None
+        self.fallback_poll_seconds = fallback_poll_seconds
+        self._last_poll_ts = 0.0
+        # Progreso para la UI (el importer puede correr en otro hilo)
+        self.on_progress = on_progress
+        self.progress = ImportProgress()
+        self._rate_ts = time.monotonic()
+        self._rate_hands = 0
+        # se puede poner en True desde otro hilo para cortar un barrido largo
+        self.stop_requested = False
+
+    @property
+    def watching(self) -> bool:
+        return self.watcher is not None and self.watcher.running
+
+    def close(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop()
     
     def run_initial_import(self) -> None:
-        files = self._list_txt_files()
-
-        for p in files:
-            st = p.stat()
+        """
+        Reparte los archivos de la carpeta en dos carriles: los de la
+        ventana (mesas en juego) van al scheduler y se atienden primero; el
+        resto queda en la cola del historial y se importa de a poco en
+        cada tick.
+        """
+        # el watcher arranca antes del barrido para no perder lo que se escriba durante el
+        if self.watcher is not None:
+            self.watcher.start()
+        now = time.time()
+        cutoff = now - self.window_seconds
+        self.index.refresh(now - self.hot_seconds, now)
+        for p in self.index.paths():
             path_str = str(p)
-            mtime = float(st.st_mtime)
-            size = int(st.st_size)
-
-            self.db.upsert_file(path_str, mtime, size)
-            file_id, last_offset, _, _ = self.db.get_file_state(path_str)
-
-            rt = self.runtime.setdefault(path_str, FileRuntimeState())
-            rt.last_change_ts = time.time()
-            if size > last_offset:
-                self._process_growth(path_str, file_id, last_offset)
+            if self.index.get(path_str).mtime >= cutoff:
+                self.scheduler.wake(path_str, now)
             else:
-                if rt.carry:
-                    self._flush_carry(path_str, file_id)
-
+                self._bulk.append((path_str, now))
+        self._last_poll_ts = now
 
     def tick(self) -> None:
-
+        """
+        Una pasada del importer: junta los archivos que cambiaron (eventos
+        de watchdog o el indice de la carpeta), los despierta en el
+        scheduler, visita los que vencieron y con lo que queda de tiempo
+        avanza el historial.
+        """
         if not self._bootstrapped:
             self.run_initial_import()
             self._bootstrapped = True
-            return
-        
+
         now = time.time()
-        cutoff = now - self.window_seconds
-        
-        files = self._list_txt_files()
-        candidates: List[Tuple[Path, float, int]] = []
-        #Filtrar por mtimer reciende segun cut off en funcion de window_seconds
-        for p in files:
-            st = p.stat()
-            if st.st_mtime >= cutoff:
-                candidates.append((p, float(st.st_mtime), int(st.st_size)))
-        candidates.sort(key=lambda x: x[1], reverse = True)
-        for p, mtime, size in candidates:
-            path_str = str(p)
-            file_id = self.db.upsert_file(path_str, mtime, size)
-            file_id, last_offset, _, _ = self.db.get_file_state(path_str)
-            rt = self.runtime.setdefault(path_str, FileRuntimeState())
-            if rt.last_change_ts == 0.0:
-                rt.last_change_ts = now
-            changed = size > last_offset
+        if self.watching:
+            self._tick_events(now)
+        # sin watchdog el indice se mira cada DISCOVERY_SECONDS; con watchdog es un respaldo
+        poll_every = self.fallback_poll_seconds if self.watching else DISCOVERY_SECONDS
+        if now - self._last_poll_ts >= poll_every:
+            self._last_poll_ts = now
+            self._discover(now)
+        t0 = time.perf_counter()
+        visited = self._poll_due(now)
+        worked = self._run_bulk(time.perf_counter() - t0)
+        if visited or worked:
+            live, bulk = self.progress.live, self.progress.bulk
+            bulk.depth = len(self._bulk)
+            self._report(0, live.depth + bulk.depth)
+
+    @property
+    def backlog(self) -> int:
+        """
+        Archivos del historial que faltan importar.
+        """
+        return len(self._bulk)
+
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Cuanto falta para la proxima visita programada (None si no hay
+        archivos activos). Sirve para ajustar el timer del worker.
+        """
+        if self._bulk:
+            return 0.0
+        due = self.scheduler.next_due()
+        if due is None:
+            return None
+        now = time.time() if now is None else now
+        return max(0.0, due - now)
+
+    def _tick_events(self, now: float) -> None:
+        """
+        Modo por eventos: los archivos que watchdog marco (ya sin eventos
+        nuevos durante el debounce) se despiertan en el scheduler. Sin
+        eventos no hay ni glob ni stat.
+        """
+        for path_str in self.watcher.pop_ready():
+            self.scheduler.wake(path_str, now)
+
+    def _discover(self, now: float) -> None:
+        # los que crecieron (nuevos, calientes o del barrido completo) se despiertan
+        for path_str in self.index.refresh(now - self.hot_seconds, now):
+            self.scheduler.wake(path_str, now)
+
+    def _poll_due(self, now: float) -> int:
+        due = self.scheduler.pop_due(now)
+        lane = self.progress.live
+        lane.depth = len(due)
+        for i, (path_str, due_ts) in enumerate(due):
+            if self.stop_requested:
+                break
+            lane.depth = len(due) - i
+            lane.observe(max(0.0, time.time() - due_ts))
+            try:
+                st = os.stat(path_str)
+            except FileNotFoundError:
+                self.scheduler.forget(path_str)
+                continue
+            before = self.progress.hands_imported
+            self._visit(path_str, float(st.st_mtime), int(st.st_size), now)
+            lane.hands += self.progress.hands_imported - before
+        lane.depth = 0
+        return len(due)
+
+    def _run_bulk(self, live_elapsed: float) -> bool:
+        """
+        Avanza el historial despues del carril en vivo. Recibe al menos
+        bulk_share del tiempo del writer (si el tick en vivo tardo L, el
+        historial tiene L * share / (1 - share)) y como minimo
+        BULK_SLICE_SECONDS.
+        """
+        if not self._bulk:
+            return False
+        share = min(max(self.bulk_share, 0.0), 0.9)
+        budget = max(BULK_SLICE_SECONDS, live_elapsed * share / (1.0 - share))
+        lane = self.progress.bulk
+        t0 = time.perf_counter()
+        while self._bulk and time.perf_counter() - t0 < budget:
+            if self.stop_requested:
+                break
+            path_str, queued_ts = self._bulk[0]
+            before = self.progress.hands_imported
+            more = self._bulk_step(path_str)
+            lane.hands += self.progress.hands_imported - before
+            if not more:
+                self._bulk.popleft()
+                lane.observe(time.time() - queued_ts)
+        lane.depth = len(self._bulk)
+        return True
+
+    def _bulk_step(self, path_str: str) -> bool:
+        """
+        Un bloque de BULK_CHUNK de un archivo del historial. Devuelve True si
+        al archivo todavia le queda por leer.
+        """
+        entry = self.index.get(path_str)
+        if entry is None:
+            return False  # se borro
+        rt = self._runtime_for(path_str, entry.mtime, entry.size)
+        if entry.size > rt.read_offset:
+            if self._process_growth(path_str, rt.file_id, rt.read_offset, BULK_CHUNK, max_chunks=1):
+                return True
+        # archivo viejo leido entero: la ultima mano ya no va a crecer
+        if rt.carry and path_str not in self.scheduler:
+            self._flush_carry(path_str, rt.file_id)
+        return False
+
+    def _runtime_for(self, path_str: str, mtime: float, size: int) -> FileRuntimeState:
+        """
+        Estado en memoria del archivo. La primera vez se arranca desde el
+        checkpoint de la BD (fin de la ultima mano commiteada), con el carry
+        vacio: la mano que quedo a medias se vuelve a leer desde ahi.
+        """
+        rt = self.runtime.get(path_str)
+        if rt is not None and size <= rt.read_offset:
+            return rt  # sin cambios: no hace falta tocar la BD
+        self.db.upsert_file(path_str, mtime, size)
+        if rt is None:
+            file_id, last_offset = self.db.get_file_state(path_str)
+            rt = self.runtime[path_str] = FileRuntimeState(file_id=file_id, read_offset=last_offset)
+        return rt
+
+    def _visit(self, path_str: str, mtime: float, size: int, now: float) -> None:
+        rt = self._runtime_for(path_str, mtime, size)
+        if rt.last_change_ts == 0.0:
+            rt.last_change_ts = now
+        changed = size > rt.read_offset
+        more = False
+        try:
             if changed:
                 rt.last_change_ts = now
-                self._process_growth(path_str, file_id, last_offset)
+                # una mesa en juego con mucho atrasado no se lee entera en una
+                # visita: el resto sigue en los ticks siguientes y el historial
+                # conserva su bulk_share
+                more = self._process_growth(path_str, rt.file_id, rt.read_offset, READ_CHUNK, max_chunks=LIVE_MAX_CHUNKS)
+                if not more and rt.carry and hand_is_complete(rt.carry):
+                    self._flush_carry(path_str, rt.file_id)
             else:
                 if rt.carry and (now - rt.last_change_ts) >= self.idle_flush_seconds:
-                    self._flush_carry(path_str, file_id)
-    
-    def _process_growth(self, path_str: str, file_id: int, last_offset: int) -> None:
-        p = Path(path_str)
-        with p.open("rb") as f:
-            f.seek(last_offset, os.SEEK_SET)
-            new_bytes = f.read()
-            new_offset = f.tell()
+                    self._flush_carry(path_str, rt.file_id)
+        finally:
+            # aunque falle el insert el archivo sigue en el scheduler: se
+            # reintenta en la proxima visita
+            flush_at = rt.last_change_ts + self.idle_flush_seconds if rt.carry else None
+            self.scheduler.record(path_str, changed, now, flush_at)
+            if more:
+                self.scheduler.wake(path_str, now)
+
+    def _report(self, inserted: int, files_pending: Optional[int] = None) -> None:
+        """
+        Actualiza el progreso (manos importadas, archivos pendientes y
+        manos/s del ultimo segundo) y avisa a on_progress.
+        """
+        self.progress.hands_imported += inserted
+        if files_pending is not None:
+            self.progress.files_pending = files_pending
+        self._rate_hands += inserted
+        now = time.monotonic()
+        elapsed = now - self._rate_ts
+        if elapsed >= 1.0:
+            self.progress.hands_per_second = self._rate_hands / elapsed
+            self._rate_ts = now
+            self._rate_hands = 0
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+    def _parse_raw(self, raw: bytes | memoryview) -> Optional[HandData]:
+        return parse_hand(raw)
+
+    def _process_growth(
+            self,
+            path_str: str,
+            file_id: int,
+            read_offset: int,
+            chunk_size: int = READ_CHUNK,
+            max_chunks: Optional[int] = None,
+    ) -> bool:
+        """
+        Lee lo nuevo del archivo en bloques de READ_CHUNK: entre bloques solo
+        queda en memoria la mano sin terminar (carry), asi el pico de memoria
+        no depende del tamano del archivo. Con las manos de cada bloque se
+        guarda, en la misma transaccion, el offset donde termina la ultima
+        mano completa (no el ultimo byte leido): si el proceso muere, al
+        volver se sigue desde ahi sin perder ni reparsear nada.
+
+        Con max_chunks corta despues de esa cantidad de bloques y devuelve
+        True si quedo algo por leer.
+        """
         rt = self.runtime[path_str]
-        buf = rt.carry + new_bytes
-        hands, carry = split_complete_hands(buf)
         inserted = 0
-        for raw in hands:
-            hand_no = extract_hand_no(raw)
-            ok = self.db.insert_hand_raw(file_id, hand_no, raw)
-            if ok:
-                inserted += 1
-        rt.carry = carry
-        self.db.update_file_offset(file_id, new_offset)
+        skipped = 0
+        chunks = 0
+        more = False
+        with open(path_str, "rb") as f:
+            f.seek(read_offset, os.SEEK_SET)
+            rt.read_offset = read_offset
+            while True:
+                if max_chunks is not None and chunks >= max_chunks:
+                    more = bool(f.read(1))
+                    break
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                chunks += 1
+                # offset y carry de rt cambian recien despues del COMMIT: si
+                # insert_hands falla, la proxima visita relee este bloque
+                base = rt.read_offset - len(rt.carry)  # offset de buf[0] en el archivo
+                next_offset = rt.read_offset + len(chunk)
+                buf = rt.carry + chunk if rt.carry else chunk
+                del chunk
+                batch = []
+                ends = []
+                carry_from = 0
+                for raw, end in iter_hand_views(buf, final=False):
+                    carry_from = end
+                    if self.db.known_hands.seen(hand_no_of(raw)):
+                        skipped += 1
+                        continue
+                    hand = self._parse_raw(raw)
+                    if hand is not None:
+                        batch.append((file_id, hand))
+                        ends.append(base + end)
+                junk = _carry_junk(buf, carry_from)
+                if junk:
+                    print(f"[SKIP] {Path(path_str).name}: {junk} bytes sin manos")
+                    carry_from += junk
+                carry = buf[carry_from:]
+                del buf
+                offsets = [(file_id, base + carry_from)] if carry_from else None
+                inserted += len(self.db.insert_hands(batch, offsets=offsets))
+                self._store(batch, ends)
+                rt.read_offset = next_offset
+                rt.carry = carry
+        self._report(inserted)
         if inserted:
-            print(f"IMPORTED {hand_no}: {inserted} hands (total = {self.db.count_hands()})")
+            print(f"IMPORTED {Path(path_str).name}: {inserted} hands (total = {self.db.count_hands()})")
+        if skipped:
+            print(f"[SKIP] {Path(path_str).name}: {skipped} hands already imported")
+        return more
+
+    def _store(self, batch: List[Tuple[int, HandData]], ends: List[int]) -> None:
+        # copia binaria de las manos (HandStore), recien con el COMMIT hecho:
+        # si insert_hands fallo no se llega aca y el archivo no se adelanta
+        # a la BD
+        if self.hand_store is None or not batch:
+            return
+        for (file_id, hand), end in zip(batch, ends):
+            self.hand_store.append(file_id, end, hand)
+        self.hand_store.flush()
 
-    def __flush_carry(self, path_str: str, file_id: int) -> None:
+    def _flush_carry(self, path_str: str, file_id: int) -> None:
+        """
+        El archivo dejo de crecer: el carry se toma como mano completa y el
+        checkpoint pasa al final de lo leido.
+        """
         rt = self.runtime[path_str]
         raw = rt.carry
-        if not raw.strip():
-            rt.carry = b""
-            return
-        for pref in HAND_START_PREFIXES:
-            if raw.startswith(pref):
-                hand_no = extract_hand_no(raw)
-                ok = self.db.insert_hand_raw(file_id, hand_no, raw)
-                if ok:
-                     print(f"[FLUSH] {Path(path_str).name}: flushed 1 hand (total={self.db.count_hands()})")
+        batch = []
+        if raw.startswith(HAND_START_PREFIXES) and not self.db.known_hands.seen(hand_no_of(raw)):
+            hand = self._parse_raw(raw)
+            if hand is not None:
+                batch.append((file_id, hand))
+        inserted = self.db.insert_hands(batch, offsets=[(file_id, rt.read_offset)])
+        self._store(batch, [rt.read_offset])
+        # el carry se suelta recien con el COMMIT hecho
         rt.carry = b""
-        
-
-
-
-
+        if inserted:
+            self._report(1)
+            print(f"[FLUSH] {Path(path_str).name}: flushed 1 hand (total={self.db.count_hands()})")
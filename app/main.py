@@ -8,13 +8,11 @@ from PySide6.QtCore import QTimer, Qt
 from PySide6.QtQuickControls2 import QQuickStyle
 from .settings import MockSettings
 from .database.db import DB
-from .importer import HandHistoryImporter
+from .parser.binfmt import HandStore
+from .worker import ImportWorker, start_import_thread, stop_import_thread
 
 load_dotenv()
 FOLDER = os.getenv('FOLDER')
-def on_tick(importer, appSettings) -> None:
-    importer.tick()
-    appSettings.refresh()
 
 
 def main():
@@ -22,16 +20,12 @@ def main():
     base_dir = Path(__file__).parent
     qml_path = base_dir / "qml" / "App.qml"
 
-    #DB
+    #DB: el importer escribe desde su hilo; la GUI lee con db.reader()
     db_path = base_dir / "poker.sqlite3"
     db = DB(db_path)
+    # manos ya parseadas, para reprocesar sin volver a pasar por el parser
+    hand_store = HandStore(base_dir / "poker.hands.bin")
     folder = FOLDER
-    importer = HandHistoryImporter(
-        db=db,
-        folder=folder,
-        window_seconds=300,
-        idle_flush_seconds=200,
-    )
 
     app = QGuiApplication(sys.argv)
     engine = QQmlApplicationEngine()
@@ -46,11 +40,27 @@ def main():
     root = engine.rootObjects()[0]
     root.setFlags(Qt.FramelessWindowHint | Qt.WindowSystemMenuHint)
 
-    timer = QTimer()
-    timer.setInterval(1000)
-    timer.timeout.connect(lambda: on_tick(importer, settings))
-    timer.start()
+    #Importer en su propio hilo
+    worker = ImportWorker(
+        db=db,
+        folder=folder,
+        window_seconds=300,
+        idle_flush_seconds=200,
+        watch=True,
+        hand_store=hand_store,
+    )
+    worker.progress.connect(settings.onImportProgress)
+    worker.lanes.connect(settings.onImportLanes)
+    worker.committed.connect(settings.onImportCommit)
+    import_thread = start_import_thread(worker)
+
+    refresh_timer = QTimer()
+    refresh_timer.setInterval(1000)
+    refresh_timer.timeout.connect(settings.refresh)
+    refresh_timer.start()
     rc = app.exec()
+    stop_import_thread(worker, import_thread)
+    hand_store.close()
     db.close()
     return rc
 
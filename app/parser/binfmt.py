@@ -0,0 +1,336 @@
+from __future__ import annotations
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .classes import Action, HandData, PlayerResult, Post, Seat
+
+# Formato binario de HandData ya parseado, para no volver a pasar por las
+# regex al reimportar o experimentar con stats.
+#
+# Archivo: _MAGIC + secuencia de registros, solo se agrega al final.
+#   registro = _REC (largo del payload, file_id, end_offset) + payload
+# (file_id, end_offset) es la misma clave que usan files.last_offset y el
+# checkpoint: el byte donde termina la mano en su archivo de texto.
+#
+# payload = _HDR + strings + seats + posts + actions + results
+#   strings: utf-8 separados por \0. Los 8 primeros son fijos (_STR_FIXED);
+#   despues vienen nombres, tipos de post y cartas, referenciados por indice.
+#   Los montos son enteros (unidades de HandData.money_scale); los numeros
+#   que pueden faltar van como _NO_MONEY o 255 (enteros chicos).
+
+_MAGIC = b"HHBIN\x00\x00\x02"  # cambia con el formato: un archivo de otra version no se lee
+_REC = struct.Struct("<IIQ")
+_HDR = struct.Struct("<BBBBBHBIH")  # max_seats, button_pos, players_seated, n_seats, n_posts, n_actions, n_results, len(strings), money_scale
+_SEAT = struct.Struct("<BHqqB")    # pos, nombre, chips, bounty, sitting_out
+_POST = struct.Struct("<HHq")      # nombre, tipo, monto
+_ACTION = struct.Struct("<BHBBqqq")  # street, nombre, accion, flags, amount, raise_from, raise_to
+_RESULT = struct.Struct("<HHq")    # nombre, cartas, collected
+# los mismos registros sin los campos que decode_compact no usa
+_SEAT_COMPACT = struct.Struct("<BHq8xB")
+_ACTION_COMPACT = struct.Struct("<BHB25x")
+_RESULT_COMPACT = struct.Struct("<H2xq")
+
+_STR_FIXED = 8  # hand_id, tournament_id, buy_in, stakes, cur, local_dt, local_tz, cards
+_NO_INT = 255
+_NO_STR = 0xFFFF
+# flags de accion: con flags == 0 (fold/check) se decodifica por el camino corto
+_ALL_IN = 1
+_HAS_MONEY = 2
+_MISSING = 4  # street o accion en None
+_NO_MONEY = -2 ** 63
+_POS = [str(i) for i in range(256)]
+
+
+def _m(x: Optional[int]) -> int:
+    return _NO_MONEY if x is None else x
+
+
+def _i(x: Optional[int]) -> int:
+    return _NO_INT if x is None else int(x)
+
+
+def encode_hand(hand: HandData) -> bytes:
+    """
+    HandData (sin stats: se recalculan con add_stats) -> payload binario.
+    """
+    strings: List[str] = [
+        hand.hand_id or "", hand.tournament_id or "", hand.buy_in or "", hand.stakes or "",
+        hand.cur or "", hand.local_dt or "", hand.local_tz or "", hand.cards or "",
+    ]
+    index: Dict[str, int] = {}
+
+    def ref(s: Optional[str]) -> int:
+        if s is None:
+            return _NO_STR
+        i = index.get(s)
+        if i is None:
+            i = index[s] = len(strings)
+            strings.append(s)
+        return i
+
+    parts: List[bytes] = []
+    for s in hand.seats:
+        parts.append(_SEAT.pack(int(s.pos), ref(s.player_name), _m(s.chips), _m(s.bounty), 1 if s.sitting_out else 0))
+    for p in hand.posts:
+        parts.append(_POST.pack(ref(p.player_name), ref(p.kind), _m(p.amount)))
+    for a in hand.actions:
+        flags = _ALL_IN if a.is_all_in else 0
+        if a.amount is not None or a.raise_from is not None or a.raise_to is not None:
+            flags |= _HAS_MONEY
+        if a.street is None or a.action is None:
+            flags |= _MISSING
+        parts.append(_ACTION.pack(
+            _i(a.street), ref(a.player_name), _i(a.action), flags,
+            _m(a.amount), _m(a.raise_from), _m(a.raise_to),
+        ))
+    for r in hand.results:
+        parts.append(_RESULT.pack(ref(r.player_name), ref(r.cards), _m(r.collected)))
+    blob = "\0".join(strings).encode("utf-8")
+    head = _HDR.pack(
+        _i(hand.max_seats), _i(hand.button_pos), _i(hand.players_seated),
+        len(hand.seats), len(hand.posts), len(hand.actions), len(hand.results), len(blob),
+        hand.money_scale,
+    )
+    return head + blob + b"".join(parts)
+
+
+def decode_hand(buf: memoryview | bytes, pos: int = 0) -> HandData:
+    """
+    Payload -> HandData igual al de parse_hand(..., stats=False).
+    """
+    max_seats, button_pos, seated, n_seats, n_posts, n_actions, n_results, n_str, scale = _HDR.unpack_from(buf, pos)
+    pos += _HDR.size
+    s = str(buf[pos:pos + n_str], "utf-8").split("\0")
+    pos += n_str
+
+    end = pos + n_seats * _SEAT.size
+    seats = [
+        Seat(_POS[p], s[n], None if c == _NO_MONEY else c, None if b == _NO_MONEY else b, so == 1)
+        for p, n, c, b, so in _SEAT.iter_unpack(buf[pos:end])
+    ]
+    pos = end
+    end = pos + n_posts * _POST.size
+    posts = [
+        Post(s[n], s[k], None if m == _NO_MONEY else m)
+        for n, k, m in _POST.iter_unpack(buf[pos:end])
+    ]
+    pos = end
+    end = pos + n_actions * _ACTION.size
+    actions = [
+        Action(st, s[n], ac) if not fl else _slow_action(st, s[n], ac, fl, am, rf, rt)
+        for st, n, ac, fl, am, rf, rt in _ACTION.iter_unpack(buf[pos:end])
+    ]
+    pos = end
+    end = pos + n_results * _RESULT.size
+    results = [
+        PlayerResult(s[n], None if c == _NO_STR else s[c], None if m == _NO_MONEY else m)
+        for n, c, m in _RESULT.iter_unpack(buf[pos:end])
+    ]
+    return HandData(
+        s[0] or None, s[1] or None, s[2] or None, s[3] or None, s[4] or None, s[5] or None, s[6] or None,
+        None if max_seats == _NO_INT else max_seats,
+        None if button_pos == _NO_INT else button_pos,
+        None if seated == _NO_INT else seated,
+        seats, posts, {}, actions, {}, {}, results, s[7] or None, scale,
+    )
+
+
+def decode_compact(buf: memoryview | bytes, pos: int = 0) -> tuple:
+    """
+    Payload -> tupla con la forma de CompactHand (rebuild), sin armar
+    dataclasses: (hand_no, max_seats, button_pos, stakes, is_tournament,
+    local_dt, seats, posts, actions, results), con los jugadores por nombre.
+    seats = (pos, nombre, chips, sitting_out), posts = (nombre, tipo, monto),
+    actions = (street, nombre, accion), results = (nombre, collected): lo
+    justo para parse_position + parse_stats. Es lo que leen rebuild y los
+    experimentos de stats.
+    """
+    max_seats, button_pos, _, n_seats, n_posts, n_actions, n_results, n_str, _ = _HDR.unpack_from(buf, pos)
+    pos += _HDR.size
+    s = str(buf[pos:pos + n_str], "utf-8").split("\0")
+    pos += n_str
+    end = pos + n_seats * _SEAT.size
+    seats = [
+        (p, s[n], None if c == _NO_MONEY else c, so)
+        for p, n, c, so in _SEAT_COMPACT.iter_unpack(buf[pos:end])
+    ]
+    pos = end
+    end = pos + n_posts * _POST.size
+    posts = [
+        (s[n], s[k], None if m == _NO_MONEY else m)
+        for n, k, m in _POST.iter_unpack(buf[pos:end])
+    ]
+    pos = end
+    end = pos + n_actions * _ACTION.size
+    actions = [(st, s[n], ac) for st, n, ac in _ACTION_COMPACT.iter_unpack(buf[pos:end])]
+    pos = end
+    end = pos + n_results * _RESULT.size
+    results = [
+        (s[n], None if m == _NO_MONEY else m)
+        for n, m in _RESULT_COMPACT.iter_unpack(buf[pos:end])
+    ]
+    return (
+        s[0], None if max_seats == _NO_INT else max_seats, None if button_pos == _NO_INT else button_pos,
+        s[3] or None, 1 if s[1] else 0, s[5] or None, seats, posts, actions, results,
+    )
+
+
+def _slow_action(st: int, name: str, ac: int, fl: int, am: int, rf: int, rt: int) -> Action:
+    if fl & _MISSING:
+        st = None if st == _NO_INT else st
+        ac = None if ac == _NO_INT else ac
+    return Action(
+        st, name, ac,
+        None if am == _NO_MONEY else am,
+        None if rf == _NO_MONEY else rf,
+        None if rt == _NO_MONEY else rt,
+        fl & _ALL_IN == _ALL_IN,
+    )
+
+
+def _check_magic(buf: mmap.mmap | memoryview | bytes, path: Path) -> None:
+    if buf[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path}: no es un archivo de manos de esta version (borrarlo lo regenera)")
+
+
+def _valid_length(mm: mmap.mmap | bytes) -> int:
+    # fin del ultimo registro completo (un corte a mitad de append deja cola)
+    pos, size = len(_MAGIC), len(mm)
+    while pos + _REC.size <= size:
+        n = _REC.unpack_from(mm, pos)[0]
+        if pos + _REC.size + n > size:
+            break
+        pos += _REC.size + n
+    return pos
+
+
+class HandStore:
+    """
+    Escritor del archivo binario (append). Las manos se agregan despues
+    del COMMIT de la BD (importer, HandWriter, parse_files_parallel), asi que el archivo nunca tiene manos que la
+    BD no tenga; si el proceso se corta entre el COMMIT y el append, a esas
+    manos les falta la copia binaria (rebuild las lee de las tablas). Si la
+    misma clave se agrega dos veces StoreReader se queda con la ultima.
+    Un registro a medio escribir se recorta al abrir.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a+b")
+        size = self._f.seek(0, os.SEEK_END)
+        if size < len(_MAGIC):
+            # nuevo (o cortado antes de terminar la cabecera)
+            self._f.truncate(0)
+            self._f.write(_MAGIC)
+            self._f.flush()
+        else:
+            with mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _check_magic(mm, self.path)
+                valid = _valid_length(mm)
+            if valid != size:
+                self._f.truncate(valid)
+        self.appended = 0
+
+    def append(self, file_id: int, end_offset: int, hand: HandData) -> None:
+        payload = encode_hand(hand)
+        self._f.write(_REC.pack(len(payload), file_id, end_offset))
+        self._f.write(payload)
+        self.appended += 1
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class StoreReader:
+    """
+    Lectura por mmap del archivo de HandStore: recorrido en orden o acceso
+    por (file_id, end_offset) o por hand_no sin cargar el archivo en memoria.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._f = open(self.path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mm) if self._mm is not None else memoryview(b"")
+        if size:
+            _check_magic(self._view, self.path)
+        self._index: Optional[Dict[Tuple[int, int], int]] = None
+        self._by_hand_no: Optional[Dict[str, int]] = None
+
+    def records(self) -> Iterator[Tuple[int, int, int]]:
+        """
+        (file_id, end_offset, posicion del payload) de cada registro completo.
+        """
+        view = self._view
+        pos, size = len(_MAGIC), len(view)
+        while pos + _REC.size <= size:
+            n, file_id, end_offset = _REC.unpack_from(view, pos)
+            start = pos + _REC.size
+            if start + n > size:
+                break
+            yield file_id, end_offset, start
+            pos = start + n
+
+    def _last_copies(self) -> Dict[Tuple[int, int], int]:
+        # (file_id, end_offset) -> payload de la ultima copia
+        if self._index is None:
+            self._index = {(f, e): start for f, e, start in self.records()}
+        return self._index
+
+    def _latest(self) -> Iterator[Tuple[int, int, int]]:
+        # records() sin las copias repetidas (ver HandStore): queda la ultima
+        last = self._last_copies()
+        for file_id, end_offset, start in self.records():
+            if last[(file_id, end_offset)] == start:
+                yield file_id, end_offset, start
+
+    def __iter__(self) -> Iterator[Tuple[int, int, HandData]]:
+        """
+        Una mano por clave, en el orden del archivo.
+        """
+        view = self._view
+        for file_id, end_offset, start in self._latest():
+            yield file_id, end_offset, decode_hand(view, start)
+
+    def compact(self) -> Iterator[Tuple[int, int, tuple]]:
+        """
+        Igual que __iter__ pero con decode_compact (sin dataclasses).
+        """
+        view = self._view
+        for file_id, end_offset, start in self._latest():
+            yield file_id, end_offset, decode_compact(view, start)
+
+    def get(self, file_id: int, end_offset: int) -> Optional[HandData]:
+        start = self._last_copies().get((file_id, end_offset))
+        return None if start is None else decode_hand(self._view, start)
+
+    def get_compact(self, hand_no: str) -> Optional[tuple]:
+        """
+        decode_compact de la mano con ese hand_no (hands.hand_no), o None.
+        """
+        if self._by_hand_no is None:
+            view = self._view
+            index: Dict[str, int] = {}
+            for _, _, start in self._latest():
+                head = start + _HDR.size
+                n_str = _HDR.unpack_from(view, start)[7]
+                blob = bytes(view[head:head + n_str])
+                index[blob[:blob.find(b"\0")].decode("utf-8")] = start
+            self._by_hand_no = index
+        start = self._by_hand_no.get(hand_no)
+        return None if start is None else decode_compact(self._view, start)
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
@@ -1,38 +1,53 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
 from typing import List, Dict
 
-@dataclass
+# Codigos de calle y accion: los mismos que guardan actions.street / actions.action
+# street:
+PREFLOP, FLOP, TURN, RIVER, SHOWDOWN = range(5)
+STREET_NAMES = ("preflop", "flop", "turn", "river", "showdown")
+
+# action:
+FOLDS, CHECKS, CALLS, BETS, RAISES = range(5)
+ACTION_NAMES = ("folds", "checks", "calls", "bets", "raises")
+
+# Montos (chips, amount, raise_*, collected) en enteros: unidades minimas
+# de la mano, monto real = valor / HandData.money_scale. bounty siempre en
+# centavos (parse_hand.BOUNTY_SCALE).
+
+@dataclass(slots=True)
 class Seat:
     pos: str | None = None
     player_name: str | None = None
-    chips: float | None = None
-    bounty: float | None = None
+    chips: int | None = None
+    bounty: int | None = None
     sitting_out: bool = False
     position: str | None = None
 
-@dataclass
+@dataclass(slots=True)
 class Action:
-    street:str | None = None
+    street:int | None = None
     player_name:str | None = None
-    action:str | None = None
-    amount:float | None = None
-    raise_from: float | None = None
-    raise_to: float | None = None
+    action:int | None = None
+    amount:int | None = None
+    raise_from: int | None = None
+    raise_to: int | None = None
     is_all_in: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Post:
     player_name: str | None = None
     kind: str | None = None
-    amount: float | None = None
+    amount: int | None = None
 
-@dataclass
+@dataclass(slots=True)
 class PlayerResult:
     player_name: str | None = None
     cards: str | None = None
-    collected: float | None = None
+    collected: int | None = None
 
-@dataclass
+@dataclass(slots=True)
 class HandData:
     hand_id: str | None
     tournament_id: str | None
@@ -54,9 +69,11 @@ class HandData:
 
     board: Dict[str, str] = field(default_factory=dict)
     results: List[PlayerResult] = field(default_factory=list)
+    cards: str | None = None
+    money_scale: int = 1  # 100 en cash (centavos), 1 en torneos (fichas)
 
 
-@dataclass
+@dataclass(slots=True)
 class PlayerStats:
     player_name: str | None
     players_at_table: int | None
@@ -1,46 +1,75 @@
-from typing import List, Iterator, Any
+from typing import List, Iterator, Any, Tuple, Deque, Optional
 from pathlib import Path
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, Future
+import os
 from .parse_hand import parse_hand
+from .split import HAND_MARK, map_file, iter_hand_views, hand_no_of
+from .classes import HandData
+from .binfmt import HandStore
+from ..database.writer import HandWriter
+from ..database.cache import KnownHands
+from ..dir_index import list_txt_files
+from .pipeline import FileJob, HandPipeline
 
-def iter_hands(fp, start_offset: int) -> Iterator[List[bytes]]:
-    cur: List[bytes] = []
-    fp.seek(start_offset)
-    started = False
-    first_line = True
-
-    for line in fp:
-        line_end_offset = fp.tell()
-
-        if first_line:
-            first_line = False
-            if start_offset==0 and line.startswith(b"\xef\xbb\xbf"):
-                line = line[3:]
-
-        if line.startswith(b"PokerStars Hand"):
-            if started and cur:
-                yield cur, prev_offset
-                cur = []
-            started = True
-        if started:
-            cur.append(line)
-        prev_offset = line_end_offset
-    if started and cur:
-        yield cur, prev_offset
-
-def list_txt_files(folder: Path) -> List[Path]:
-        if not folder.exists():
-            return []
-        files: List[Path] = []
-        for p in folder.glob("*.txt"):
-            if p.is_file():
-                files.append(p)
-        return sorted(files)
-
-
-def parse_files(hh_folder: Path, database: Any) -> None:
-    files = list_txt_files(hh_folder)
-    hands = []
-    for file_path in files:
+RANGE_BYTES = 8 * 1024 * 1024
+BATCH_HANDS = 2000
+# en carga masiva las transacciones son mas grandes (sin indices que mantener)
+BULK_BATCH_HANDS = 20000
+# bulk_load automatico: BD (casi) vacia y bastante para importar
+BULK_MAX_EXISTING_HANDS = 50_000
+BULK_MIN_BYTES = 16 * 1024 * 1024
+
+def iter_hands(fp, start_offset: int) -> Iterator[Tuple[List[bytes], int]]:
+    with map_file(fp) as mm:
+        for view, end_offset in iter_hand_views(mm, start_offset):
+            yield bytes(view).splitlines(keepends=True), end_offset
+
+def use_bulk_load(database: Any, pending_bytes: int, bulk: Optional[bool] = None) -> bool:
+    """
+    bulk=None decide solo: carga masiva si la BD tiene pocas manos y hay al
+    menos BULK_MIN_BYTES por importar.
+    """
+    if bulk is not None:
+        return bulk
+    return pending_bytes >= BULK_MIN_BYTES and database.count_hands() <= BULK_MAX_EXISTING_HANDS
+
+
+def _enter_bulk_load(stack: ExitStack, database: Any, pending_bytes: int, bulk: Optional[bool]) -> bool:
+    """
+    Entra a DB.bulk_load si corresponde (ver use_bulk_load). bulk_load es
+    solo offline: si la BD esta abierta en otra conexion, con bulk=None se
+    sigue con el import normal y con bulk=True se propaga el RuntimeError.
+    """
+    if not use_bulk_load(database, pending_bytes, bulk):
+        return False
+    try:
+        stack.enter_context(database.bulk_load())
+    except RuntimeError as e:
+        if bulk:
+            raise
+        print(f"{e}: import sin carga masiva")
+        return False
+    return True
+
+
+def parse_files(
+        hh_folder: Path,
+        database: Any,
+        workers: int = 1,
+        bulk: Optional[bool] = None,
+        store: Optional[HandStore] = None,
+) -> None:
+    """
+    Importa las manos nuevas de la carpeta. Con store, las manos parseadas
+    tambien quedan en el archivo binario (ver binfmt), por (file_id, offset).
+    """
+    if workers > 1:
+        parse_files_parallel(hh_folder, database, workers=workers, bulk=bulk, store=store)
+        return
+    jobs: List[FileJob] = []
+    for file_path in list_txt_files(hh_folder):
         st = file_path.stat() #metadatos del archivo
         path_str = str(file_path) 
         mtime = float(st.st_mtime) #fecha de modificacion
@@ -51,13 +80,142 @@ def parse_files(hh_folder: Path, database: Any) -> None:
 
         if current_size <= last_offset:
             continue
+        jobs.append(FileJob(path_str, file_id, last_offset, current_size))
+
+    # reader -> splitter -> parser -> stats -> writer, con el checkpoint de
+    # cada archivo en la misma transaccion que sus manos
+    skipped_before = database.known_hands.skipped
+    with ExitStack() as stack:
+        bulk = _enter_bulk_load(stack, database, sum(j.end - j.start for j in jobs), bulk)
+        max_hands = BULK_BATCH_HANDS if bulk else BATCH_HANDS
+        pipeline = HandPipeline(HandWriter(database, max_hands=max_hands, store=store), skip=database.known_hands.seen)
+        pipeline.run(jobs)
+    _report_skipped(database.known_hands.skipped - skipped_before)
+    if jobs:
+        print("\n".join(pipeline.report()))
+
+
+def _report_skipped(skipped: int) -> None:
+    if skipped:
+        print(f"Saltadas {skipped} manos ya importadas (sin parsear)")
+
+
+def split_file_ranges(path: Path, start: int, end: int, range_bytes: int = RANGE_BYTES) -> List[Tuple[int, int]]:
+    """
+    Parte [start, end) de un archivo en rangos de ~range_bytes que empiezan
+    siempre en el inicio de una mano.
+    """
+    ranges: List[Tuple[int, int]] = []
+    with map_file(path) as mm:
+        a = start
+        while a < end:
+            b = end
+            if a + range_bytes < end:
+                i = mm.find(HAND_MARK, a + range_bytes - 1, end)
+                if i != -1:
+                    b = i + 1
+            ranges.append((a, b))
+            a = b
+    return ranges
+
+
+_worker_known: KnownHands | None = None
+
+
+def _init_worker(known: KnownHands) -> None:
+    global _worker_known
+    _worker_known = known
+
+
+def _parse_range(task: Tuple[str, int, int]) -> Tuple[str, int, List[Tuple[int, HandData]], int]:
+    # Corre en el proceso worker: solo parsea, nunca toca la BD.
+    # Cada mano va con el offset donde termina (clave del HandStore).
+    path_str, start, end = task
+    hands: List[Tuple[int, HandData]] = []
+    skipped = 0
+    with map_file(path_str) as mm:
+        for view, hand_end in iter_hand_views(mm, start, end):
+            if _worker_known is not None and _worker_known.seen(hand_no_of(view)):
+                skipped += 1
+                continue
+            hand = parse_hand(view)
+            if hand is not None:
+                hands.append((hand_end, hand))
+    return path_str, end, hands, skipped
+
+
+def parse_files_parallel(
+        hh_folder: Path,
+        database: Any,
+        workers: int | None = None,
+        range_bytes: int = RANGE_BYTES,
+        bulk: Optional[bool] = None,
+        store: Optional[HandStore] = None,
+) -> None:
+    """
+    Import inicial en paralelo: los workers parsean rangos de archivo
+    (parse_hand + parse_stats) y este proceso es el unico writer de la BD.
+    Los resultados se escriben en el mismo orden en que se generaron los
+    rangos, y files.last_offset avanza en la misma transaccion que las
+    manos del rango, asi que si se corta se reanuda exactamente desde el
+    ultimo rango commiteado.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks: List[Tuple[str, int, int]] = []
+    file_ids = {}
+    for file_path in list_txt_files(hh_folder):
+        st = file_path.stat()
+        path_str = str(file_path)
+        mtime = float(st.st_mtime)
+        current_size = int(st.st_size)
+
+        database.upsert_file(path_str, mtime, current_size)
+        file_id, last_offset = database.get_file_state(path_str)
+        if current_size <= last_offset:
+            continue
+        file_ids[path_str] = file_id
+        for a, b in split_file_ranges(file_path, last_offset, current_size, range_bytes):
+            tasks.append((path_str, a, b))
+
+    if not tasks:
+        return
+    with ExitStack() as stack:
+        _enter_bulk_load(stack, database, sum(b - a for _, a, b in tasks), bulk)
+        _run_ranges(database, tasks, file_ids, workers, store)
+
 
-        with file_path.open("rb") as f:
-            new_offset = last_offset
-            for hand_lines, end_offset in iter_hands(f, last_offset):
-                new_offset = end_offset
-                hand = parse_hand(hand_lines)
-                hands.append(hand)
-                database.insert_hand(file_id=file_id, hand=hand)
+def _run_ranges(
+        database: Any,
+        tasks: List[Tuple[str, int, int]],
+        file_ids: dict,
+        workers: int,
+        store: Optional[HandStore] = None,
+) -> None:
+    # Ventana acotada de rangos en vuelo: si el writer va mas lento que los
+    # workers no se acumulan manos parseadas en memoria.
+    max_in_flight = workers * 2
+    skipped = 0
+    # cada worker recibe una copia de los hand_no ya importados
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(database.known_hands,)) as pool:
+        pending: Deque[Future] = deque()
+        it = iter(tasks)
+        for task in it:
+            pending.append(pool.submit(_parse_range, task))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            path_str, end, hands, range_skipped = pending.popleft().result()
+            skipped += range_skipped
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(pool.submit(_parse_range, nxt))
 
-        database.set_file_offset(file_id=file_id, last_offset=new_offset, mtime=mtime, size=current_size)
+            file_id = file_ids[path_str]
+            database.insert_hands([(file_id, hand) for _, hand in hands], offsets=[(file_id, end)])
+            # al archivo binario recien con el COMMIT hecho
+            if store is not None and hands:
+                for hand_end, hand in hands:
+                    store.append(file_id, hand_end, hand)
+                store.flush()
+    database.known_hands.skipped += skipped
+    _report_skipped(skipped)
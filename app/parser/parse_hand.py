@@ -1,26 +1,175 @@
 from __future__ import annotations
 
+import re
 from typing import Dict, Optional, Set, List
+from sys import intern
 from .classes import *
 from .regex import *
 from .parse_stats import parse_stats
 from .parse_position import parse_position
 
 
-def to_float_money(b: bytes | None) -> float | None:
+# Montos en enteros: unidades minimas de la mano (HandData.money_scale).
+# Cash en centavos; torneos en fichas (siempre enteras). Los bounties son
+# plata aunque la mano sea de torneo: van siempre en centavos.
+CASH_SCALE = 100
+BOUNTY_SCALE = 100
+
+# todo lo que no sea digito o separador (simbolo de moneda, espacios)
+_NON_DIGITS = bytes(c for c in range(256) if c not in b"0123456789.,")
+_SCALE_DIGITS = {1: 0, 10: 1, 100: 2, 1000: 3}
+
+
+def parse_money(b: bytes | None, scale: int) -> int | None:
+    """
+    Monto del texto ("1500", "$0.05", "1,5") -> monto * scale como int,
+    sin decode ni float. scale es potencia de 10; si sobran decimales se
+    redondea (la coma se toma como separador decimal, igual que antes).
+    """
     if b is None:
         return None
-    s = b.decode("utf-8", "replace").strip()
-    s = s.replace("€", "").replace("$", "").replace("\xa0", " ").strip()
-    s = s.replace(",", ".")
-    try:
-        return float(s)
-    except ValueError:
+    if b.isdigit():
+        return int(b) * scale
+    if scale == CASH_SCALE and b[-3:-2] == b".":
+        # "$12.34": el caso comun en cash, sin partir el numero
+        cents = b[:-3].lstrip(_NON_DIGITS) + b[-2:]
+        if cents.isdigit():
+            return int(cents)
+    b = b.strip(_NON_DIGITS)
+    if b"," in b:
+        b = b.replace(b",", b".")
+    whole, dot, frac = b.partition(b".")
+    if not frac.isdigit():
+        return int(whole) * scale if whole.isdigit() and not dot else None
+    digits = _SCALE_DIGITS[scale]
+    n = len(frac)
+    if n == digits:
+        return int(whole + frac) if whole else int(frac)
+    value = int(whole) * scale if whole else 0
+    if n > digits:
+        value += int(frac[:digits]) if digits else 0
+        return value + 1 if frac[digits] >= 0x35 else value  # 0x35 = b"5"
+    return value + int(frac) * 10 ** (digits - n)
+
+
+_STREET_MARKERS = {b"FL": FLOP, b"TU": TURN, b"RI": RIVER}
+
+_POST = -1
+
+# una linea con su salto (la ultima puede no tenerlo). memoryview no tiene
+# find ni splitlines; los regex si aceptan la vista y devuelven bytes.
+_LINE_RE = re.compile(rb"[^\n]*\n|[^\n]+")
+
+# primeros 4 bytes despues de "<jugador>: "
+_LINE_KINDS = {
+    b"post": _POST,
+    b"fold": FOLDS,
+    b"chec": CHECKS,
+    b"call": CALLS,
+    b"bets": BETS,
+    b"rais": RAISES,
+}
+
+_ACTION_CODES = {name.encode(): code for code, name in enumerate(ACTION_NAMES)}
+
+
+def _parse_seat(line: bytes, scale: int) -> Seat | None:
+    ms = SEAT_RE.match(line)
+    if not ms:
         return None
+    sgd = ms.groupdict()
+    bounty = None
+    if sgd.get("bounty") is not None:
+        bounty = parse_money(sgd["bounty"], BOUNTY_SCALE)
+    return Seat(
+        pos=sgd["seat_no"].decode("utf-8", "replace"),          # o int(...)
+        player_name=intern(sgd["player_name"].decode("utf-8", "replace")),
+        chips=parse_money(sgd["chips"], scale),
+        bounty=bounty,
+        sitting_out=(b"is sitting out" in line or b"out of hand" in line),
+    )
+
+
+def _parse_summary_seat(line: bytes, scale: int) -> PlayerResult | None:
+    msu = SEAT_SUMMARY_RE.match(line.rstrip(b"\r\n"))
+    if not msu:
+        return None
+    sgd = msu.groupdict()
+    player = intern(sgd["player_name"].decode("utf-8", "replace"))
+
+    cards = None
+    collected = None
+
+    if sgd.get("showed"):
+        cards = sgd["showed"].decode("utf-8", "replace")
+        if sgd.get("won"):
+            collected = parse_money(sgd["won"], scale)
+    elif sgd.get("mucked"):
+        cards = sgd["mucked"].decode("utf-8", "replace")
+    elif sgd.get("collected"):
+        collected = parse_money(sgd["collected"], scale)
+
+    return PlayerResult(player_name=player, cards=cards, collected=collected)
+
+
+def _parse_post(line: bytes, scale: int) -> Post | None:
+    mp = POST_RE.match(line)
+    if not mp:
+        print("POST NO MATCH:", repr(line))
+        return None
+    pgd = mp.groupdict()
+    return Post(
+        player_name=intern(pgd["player_name"].decode("utf-8", "replace")),
+        kind=intern(pgd["kind"].decode("utf-8", "replace")),
+        amount=parse_money(pgd["amount"], scale),
+    )
+
+
+def _parse_action(line: bytes, street: int, scale: int) -> Action | None:
+    ma = ACTION_RE.match(line)
+    if not ma:
+        #print("ACTION NO MATCH:", repr(line))
+        return None
+    agd = ma.groupdict()
+
+    amount = None
+    raise_from = None
+    raise_to = None
+
+    if agd.get("bet"):
+        amount = parse_money(agd["bet"], scale)
+    elif agd.get("call_amount"):
+        amount = parse_money(agd["call_amount"], scale)
+    elif agd.get("raise_from") or agd.get("raise_to"):
+        raise_from = parse_money(agd["raise_from"], scale)
+        raise_to = parse_money(agd["raise_to"], scale)
+
+    return Action(
+        street=street,
+        player_name=intern(agd["player_name"].decode("utf-8", "replace")),
+        action=_ACTION_CODES[agd["action"]],
+        amount=amount,
+        raise_from=raise_from,
+        raise_to=raise_to,
+        is_all_in=agd.get("is_all_in") is not None,
+    )
+
+
+def add_stats(hand: HandData) -> HandData:
+    """
+    Posiciones y stats por jugador. parse_hand lo hace solo salvo con
+    stats=False (el pipeline lo corre como una etapa aparte).
+    """
+    parse_position(hand)
+    hand.stats = parse_stats(hand)
+    return hand
 
 
-def parse_hand(lines: List[bytes]) -> HandData:
-    #Paso 1. Header Line
+def _parse_head(lines: List[bytes]) -> HandData | None:
+    """
+    Pasos 1 y 2: header (lines[0]) y mesa (lines[1]). Sin lineas devuelve
+    la mano vacia; None si alguna de las dos no matchea.
+    """
     hand = HandData(
         hand_id=None, tournament_id=None, buy_in=None, stakes=None,
         cur=None, local_dt=None, local_tz=None, max_seats=None, players_seated=None, button_pos=None
@@ -29,7 +178,7 @@ def parse_hand(lines: List[bytes]) -> HandData:
         return hand
     m = HAND_START_RE.match(lines[0])
     if not m:
-        print("Hand Start line NO MATCH:", line)
+        print("Hand Start line NO MATCH:", lines[0])
         return None
     gd = m.groupdict()
     hand.hand_id = gd["hand_id"].decode("utf-8", "replace")
@@ -39,136 +188,91 @@ def parse_hand(lines: List[bytes]) -> HandData:
     hand.cur = (gd.get("cur") or gd.get("cur_cash") or b"").decode("utf-8", "replace") or None
     hand.local_dt = gd["local_dt"].decode("utf-8", "replace")
     hand.local_tz = gd["local_tz"].decode("utf-8", "replace")
-    #Paso 2. Table Line
+    hand.money_scale = 1 if hand.tournament_id else CASH_SCALE
     mt = TABLE_START_RE.match(lines[1])
     if not mt:
-        print("Table line NO MATCH:", line)
+        print("Table line NO MATCH:", lines[1])
         return None
 
     tgd = mt.groupdict()
     hand.max_seats = int(tgd["max_seats"].decode("utf-8", "replace"))
     hand.button_pos = int(tgd["btn_pos"].decode("utf-8", "replace"))
+    return hand
+
+
+def parse_hand(lines: List[bytes] | bytes | memoryview, stats: bool = True) -> HandData:
+    if not isinstance(lines, list):
+        # las lineas salen directo de la vista (memoryview del mmap), sin
+        # copiar antes la mano entera a bytes
+        lines = _LINE_RE.findall(lines)
+    hand = _parse_head(lines)
+    if hand is None or not lines:
+        return hand
+    scale = hand.money_scale
 
-    #Paso 3. Sitios, posts, resultados.
-    current_street = "preflop"
+    #Paso 3. Sitios, posts, acciones, resultados.
+    # Cada linea se mira una sola vez y va a un unico matcher.
+    current_street = PREFLOP
     in_summary = False
-    for line in lines:
-        if line.startswith(b"*** FLOP"):
-            current_street = "flop"
-        elif line.startswith(b"*** TURN"):
-            current_street = "turn"
-        elif line.startswith(b"*** RIVER"):
-            current_street = "river"
-
-        if line.startswith(b"*** SUMMARY"):
-            in_summary = True
+    seats = hand.seats
+    posts = hand.posts
+    actions = hand.actions
+    for line in lines[2:]:
+        if line.startswith(b"*** "):
+            tag = line[4:6]
+            if tag == b"SU":
+                in_summary = True
+            else:
+                current_street = _STREET_MARKERS.get(tag, current_street)
             continue
-        if current_street == "preflop" and line.startswith(b"Dealt to"):
-            mdealt = DEALT_RE.match(line)
-            if not mdealt:
-                continue
-            dealt_group = mdealt.groupdict()
-            hand.cards = dealt_group.get("cards")
+
         if line.startswith(b"Seat "):
-            if in_summary == False:
-                ms = SEAT_RE.match(line)
-                if not ms:
-                    continue
-                sgd = ms.groupdict()
-                bounty = None
-                if sgd.get("bounty") is not None:
-                    bounty = to_float_money(sgd["bounty"])
-                seat = Seat(
-                    pos=sgd["seat_no"].decode("utf-8", "replace"),          # o int(...)
-                    player_name=sgd["player_name"].decode("utf-8", "replace"),
-                    chips=to_float_money(sgd["chips"]),
-                    bounty=bounty,
-                    sitting_out=(b"is sitting out" in line or b"out of hand" in line),
-                )
-                hand.seats.append(seat)
-                continue
+            if not in_summary:
+                seat = _parse_seat(line, scale)
+                if seat is not None:
+                    seats.append(seat)
             else:
-                msu = SEAT_SUMMARY_RE.match(line.rstrip(b"\r\n"))
-                if not msu:
-                    continue
-                sgd = msu.groupdict()
-                player = sgd["player_name"].decode("utf-8", "replace")
-
-                cards = None
-                collected = None
-
-                if sgd.get("showed"):
-                    cards = sgd["showed"].decode("utf-8", "replace")
-                    if sgd.get("won"):
-                        try:
-                            collected = to_float_money(sgd["won"])
-                        except ValueError:
-                            collected = None
-                elif sgd.get("mucked"):
-                    cards = sgd["mucked"].decode("utf-8", "replace")
-                elif sgd.get("collected"):
-                    try:
-                        collected = to_float_money(sgd["collected"])
-                    except ValueError:
-                        collected = None
-
-                res = PlayerResult(player_name=player, cards=cards, collected=collected)
-                hand.results.append(res)
-                continue
+                res = _parse_summary_seat(line, scale)
+                if res is not None:
+                    hand.results.append(res)
+            continue
 
-        if b": posts " in line:
-            mp = POST_RE.match(line)
-            if not mp:
-                print("POST NO MATCH:", repr(line))
-                continue
+        if line.startswith(b"Dealt to"):
+            if current_street == PREFLOP:
+                mdealt = DEALT_RE.match(line)
+                if mdealt:
+                    hand.cards = mdealt.group("cards").decode("utf-8", "replace")
+            continue
 
-            pgd = mp.groupdict()
-            post = Post(
-                player_name=pgd["player_name"].decode("utf-8", "replace"),
-                kind=pgd["kind"].decode("utf-8", "replace"),
-                amount=to_float_money(pgd["amount"]),
-            )
-            hand.posts.append(post)
+        i = line.rfind(b": ")
+        if i == -1:
+            continue
+        kind = _LINE_KINDS.get(line[i + 2:i + 6])
+        if kind is None:
             continue
 
-        if b": " in line and (
-            b": folds" in line or
-            b": checks" in line or
-            b": bets" in line or
-            b": raises" in line or
-            b": calls" in line
-        ):
-            ma = ACTION_RE.match(line)
-            if not ma:
-                #print("ACTION NO MATCH:", repr(line))
-                continue
-            agd = ma.groupdict()
-
-            amount = None
-            raise_from = None
-            raise_to = None
-
-            if agd.get("bet"):
-                amount = to_float_money(agd["bet"])
-            elif agd.get("call_amount"):
-                amount = to_float_money(agd["call_amount"])
-            elif agd.get("raise_from") or agd.get("raise_to"):
-                raise_from = to_float_money(agd["raise_from"])
-                raise_to = to_float_money(agd["raise_to"])
-
-            action = Action(
-                street=current_street,  # lo pondremos en el siguiente paso
-                player_name=agd["player_name"].decode("utf-8", "replace"),
-                action=agd["action"].decode("utf-8", "replace"),
-                amount=amount,
-                raise_from=raise_from,
-                raise_to=raise_to,
-                is_all_in=agd.get("is_all_in") is not None,
-            )
-
-            hand.actions.append(action)
+        if kind == _POST:
+            post = _parse_post(line, scale)
+            if post is not None:
+                posts.append(post)
             continue
+
+        # Camino rapido: "<jugador>: folds" / "<jugador>: checks" sin regex
+        if kind == FOLDS or kind == CHECKS:
+            tail = line[i + 2:].strip()
+            if tail == b"folds" or tail == b"checks":
+                actions.append(Action(
+                    street=current_street,
+                    player_name=intern(line[:i].decode("utf-8", "replace")),
+                    action=kind,
+                ))
+                continue
+
+        action = _parse_action(line, current_street, scale)
+        if action is not None:
+            actions.append(action)
+
     hand.players_seated = len(hand.seats)
-    parse_position(hand)
-    hand.stats = parse_stats(hand)
+    if stats:
+        add_stats(hand)
     return hand
@@ -92,6 +92,12 @@ def _init_player_stats(
     )
 
 
+# Subirla cuando cambia lo que cuenta un stat: DB() recalcula player_stats y
+# hand_player_facts de las BD guardadas con una version anterior.
+# 2: check_raise_flop, check_raise_flop_opp y river_bet, una vez por mano.
+STATS_VERSION = 2
+
+
 def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
 
     players: List[str] = [
@@ -174,11 +180,11 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
         action = getattr(ac, "action", None)
 
         # si ya foldeó, ignora (por robustez)
-        if player not in active and action != "folds":
+        if player not in active and action != FOLDS:
             continue
 
         # ---------------- PREFLOP ----------------
-        if street == "preflop":
+        if street == PREFLOP:
 
             # === OPORTUNIDADES (se cuentan cuando el jugador está en el spot) ===
 
@@ -222,7 +228,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                 bb_vs_steal_opp_counted = True
 
             # === ACCIÓN ===
-            if action == "folds":
+            if action == FOLDS:
                 # fold_to_3bet (si el que foldea es el opener vs 3bet)
                 if three_bettor is not None and player == open_raiser:
                     stats[player].fold_to_3bet += 1
@@ -240,7 +246,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                 active.discard(player)
                 continue
 
-            if action == "raises":
+            if action == RAISES:
                 # Open raise (RFI)
                 if open_raiser is None:
                     open_raiser = player
@@ -265,7 +271,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
 
                 continue
 
-            if action == "calls":
+            if action == CALLS:
                 # caller antes del 3bet => squeeze spot
                 if open_raiser is not None and three_bettor is None and player != open_raiser:
                     had_caller_before_3bet = True
@@ -284,22 +290,22 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
             continue
 
         # ---------------- FLOP ----------------
-        if street == "flop":
+        if street == FLOP:
             if player in active:
                 saw_flop.add(player)
 
-            if action == "folds":
+            if action == FOLDS:
                 if did_cbet and player in cbet_faced:
                     stats[player].fold_to_cbet_opp += 1
                     stats[player].fold_to_cbet += 1
                 active.discard(player)
                 continue
 
-            if action == "checks":
+            if action == CHECKS:
                 flop_checked.add(player)
                 continue
 
-            if action in ("bets", "raises"):
+            if action in (BETS, RAISES):
                 if flop_first_bet_by is None:
                     flop_first_bet_by = player
 
@@ -308,7 +314,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                         stats[preflop_aggressor].c_bet_opp += 1
 
                     # cbet si el agresor hace la primera bet (bets)
-                    if preflop_aggressor and player == preflop_aggressor and action == "bets":
+                    if preflop_aggressor and player == preflop_aggressor and action == BETS:
                         did_cbet = True
                         stats[player].c_bet += 1
                         cbet_faced = {x for x in active if x != player}
@@ -318,25 +324,26 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                         stats[player].donk_flop += 1
                 else:
                     # check-raise: si había check previo y ahora raise
-                    stats[player].check_raise_flop_opp += 1
-                    if action == "raises" and player in flop_checked:
-                        stats[player].check_raise_flop += 1
+                    # (una vez por mano aunque vuelva a subir)
+                    stats[player].check_raise_flop_opp = 1
+                    if action == RAISES and player in flop_checked:
+                        stats[player].check_raise_flop = 1
 
             continue
 
         # ---------------- TURN ----------------
-        if street == "turn":
+        if street == TURN:
             if player in active:
                 saw_turn.add(player)
 
-            if action == "folds":
+            if action == FOLDS:
                 if did_barrel_turn and player in barrel_turn_faced:
                     stats[player].fold_to_barrel_turn_opp += 1
                     stats[player].fold_to_barrel_turn += 1
                 active.discard(player)
                 continue
 
-            if action in ("bets", "raises"):
+            if action in (BETS, RAISES):
                 if turn_first_bet_by is None:
                     turn_first_bet_by = player
 
@@ -345,7 +352,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                         stats[preflop_aggressor].barrel_turn_opp += 1
 
                     # barrel turn si agresor (que hizo cbet) hace primera bet del turn
-                    if preflop_aggressor and did_cbet and player == preflop_aggressor and action == "bets":
+                    if preflop_aggressor and did_cbet and player == preflop_aggressor and action == BETS:
                         did_barrel_turn = True
                         stats[player].barrel_turn += 1
                         barrel_turn_faced = {x for x in active if x != player}
@@ -353,7 +360,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
             continue
 
         # ---------------- RIVER ----------------
-        if street == "river":
+        if street == RIVER:
             if player in active:
                 saw_river.add(player)
 
@@ -362,15 +369,16 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                 stats[player].river_bet_opp += 1
                 river_opp_counted.add(player)
 
-            if action == "folds":
+            if action == FOLDS:
                 if did_barrel_river and player in barrel_river_faced:
                     stats[player].fold_to_barrel_river_opp += 1
                     stats[player].fold_to_barrel_river += 1
                 active.discard(player)
                 continue
 
-            if action in ("bets", "raises"):
-                stats[player].river_bet += 1
+            if action in (BETS, RAISES):
+                # una vez por mano, como river_bet_opp
+                stats[player].river_bet = 1
 
                 if river_first_bet_by is None:
                     river_first_bet_by = player
@@ -380,7 +388,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
                         stats[preflop_aggressor].barrel_river_opp += 1
 
                     # barrel river si agresor (que barreleó turn) hace primera bet del river
-                    if preflop_aggressor and did_barrel_turn and player == preflop_aggressor and action == "bets":
+                    if preflop_aggressor and did_barrel_turn and player == preflop_aggressor and action == BETS:
                         did_barrel_river = True
                         stats[player].barrel_river += 1
                         barrel_river_faced = {x for x in active if x != player}
@@ -404,7 +412,7 @@ def parse_stats(hand: "HandData") -> Dict[str, "PlayerStats"]:
             p = result.player_name
             if not p or p not in stats:
                 continue
-            collected = result.collected or 0.0
+            collected = result.collected or 0
 
             if collected > 0:
                 stats[p].won_hand = 1
@@ -0,0 +1,309 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .parse_hand import parse_hand, add_stats
+from .split import iter_hand_bounds, hand_no_of
+from ..database.writer import HandWriter
+
+READ_CHUNK = 1024 * 1024
+# manos por item entre etapas (una Queue por mano cuesta mas que parsearla)
+SPLIT_BATCH = 128
+# items en vuelo por cola: el reader tiene como mucho ~4 bloques de READ_CHUNK
+READ_QUEUE = 4
+STAGE_QUEUE = 16
+
+_DONE = object()
+
+
+class _Stopped(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class FileJob:
+    path: str
+    file_id: int
+    start: int
+    end: int
+
+
+@dataclass(slots=True)
+class StageStats:
+    name: str
+    unit: str = "manos"
+    items: float = 0
+    busy: float = 0.0
+    wait_in: float = 0.0
+    wait_out: float = 0.0
+    q_sum: int = 0
+    q_samples: int = 0
+    q_max: int = 0
+
+    def sample(self, q: queue.Queue) -> None:
+        self.q_sum += q.qsize()
+        self.q_samples += 1
+        self.q_max = q.maxsize
+
+    @property
+    def rate(self) -> float:
+        return self.items / self.busy if self.busy else 0.0
+
+    @property
+    def occupancy(self) -> float:
+        # llenado medio de la cola de salida (1.0 = la etapa siguiente no da abasto)
+        if not self.q_samples or not self.q_max:
+            return 0.0
+        return self.q_sum / (self.q_samples * self.q_max)
+
+    def line(self) -> str:
+        return (f"{self.name:<8} {self.items:>9.0f} {self.unit:<5} {self.busy:7.2f} s ocupado "
+                f"{self.rate:>10.0f} {self.unit}/s  cola salida {self.occupancy:4.0%}  "
+                f"espera entrada {self.wait_in:6.2f} s  salida {self.wait_out:6.2f} s")
+
+
+class HandPipeline:
+    """
+    Import por etapas con colas acotadas entre ellas:
+
+        reader -> splitter -> parser(es) -> stats -> writer
+
+    reader, splitter, parser y stats son hilos; el writer corre en el hilo
+    que llama a run() (la conexion sqlite es de ese hilo) y escribe con un
+    HandWriter. sqlite suelta el GIL durante el commit, asi que un commit
+    lento se superpone con el parseo en vez de frenarlo, y las colas
+    acotadas ponen un techo a la memoria: si el writer se atrasa, las
+    etapas de arriba se bloquean.
+
+    Los offsets de cada mano viajan con ella y el writer los guarda en la
+    misma transaccion (HandWriter.checkpoint/add con end_offset). Con mas
+    de un parser, la etapa stats reordena los lotes por numero de secuencia
+    para que los checkpoints sigan el orden del archivo.
+    """
+
+    def __init__(
+            self,
+            writer: HandWriter,
+            skip: Optional[Callable[[Optional[int]], bool]] = None,
+            parser_threads: int = 1,
+            chunk_size: int = READ_CHUNK,
+            batch_size: int = SPLIT_BATCH,
+    ):
+        self.writer = writer
+        self.skip = skip
+        self.parser_threads = max(1, parser_threads)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.stats: Dict[str, StageStats] = {
+            "reader": StageStats("reader", unit="MiB"),
+            "splitter": StageStats("splitter"),
+            "parser": StageStats("parser"),
+            "stats": StageStats("stats"),
+            "writer": StageStats("writer"),
+        }
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self, jobs: Iterable[FileJob]) -> int:
+        """
+        Importa los rangos [start, end) de cada archivo. Devuelve la cantidad
+        de manos nuevas insertadas.
+        """
+        q_read: queue.Queue = queue.Queue(READ_QUEUE)
+        q_split: queue.Queue = queue.Queue(STAGE_QUEUE)
+        q_parsed: queue.Queue = queue.Queue(STAGE_QUEUE)
+        q_stats: queue.Queue = queue.Queue(STAGE_QUEUE)
+        threads = [
+            threading.Thread(target=self._guard, args=(self._reader, list(jobs), q_read), daemon=True),
+            threading.Thread(target=self._guard, args=(self._splitter, q_read, q_split), daemon=True),
+            threading.Thread(target=self._guard, args=(self._stats_stage, q_parsed, q_stats), daemon=True),
+        ]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._parser, q_split, q_parsed), daemon=True)
+            for _ in range(self.parser_threads)
+        ]
+        for t in threads:
+            t.start()
+        inserted_before = self.writer.inserted
+        try:
+            self._write(q_stats)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+        if self._error is not None:
+            raise self._error
+        return self.writer.inserted - inserted_before
+
+    def report(self) -> List[str]:
+        return [st.line() for st in self.stats.values()]
+
+    # --- etapas ---
+
+    def _reader(self, jobs: List[FileJob], q_out: queue.Queue) -> None:
+        st = self.stats["reader"]
+        for job in jobs:
+            with open(job.path, "rb") as f:
+                f.seek(job.start)
+                offset = job.start
+                while True:
+                    t = time.perf_counter()
+                    want = min(self.chunk_size, job.end - offset)
+                    data = f.read(want) if want > 0 else b""
+                    st.busy += time.perf_counter() - t
+                    # el ultimo bloque (o uno vacio si el archivo se achico) cierra el carry
+                    last = not data or offset + len(data) >= job.end
+                    st.items += len(data) / (1024 * 1024)
+                    self._put(q_out, (job.file_id, offset, data, last), st)
+                    offset += len(data)
+                    if last:
+                        break
+        self._put(q_out, _DONE, st)
+
+    def _splitter(self, q_in: queue.Queue, q_out: queue.Queue) -> None:
+        st = self.stats["splitter"]
+        carry = b""
+        seq = 0
+        batch: List[Tuple[int, Optional[bytes], int]] = []
+        while True:
+            item = self._get(q_in, st)
+            if item is _DONE:
+                break
+            t = time.perf_counter()
+            file_id, offset, data, last = item
+            buf = carry + data if carry else data
+            base = offset - len(carry)
+            carry_from = 0
+            for a, b in iter_hand_bounds(buf, final=last):
+                carry_from = b
+                raw = buf[a:b]
+                if self.skip is not None and self.skip(hand_no_of(raw)):
+                    raw = None  # solo avanza el checkpoint
+                batch.append((file_id, raw, base + b))
+                st.items += 1
+                if len(batch) >= self.batch_size:
+                    st.busy += time.perf_counter() - t
+                    self._put(q_out, (seq, batch), st)
+                    t = time.perf_counter()
+                    seq += 1
+                    batch = []
+            carry = b"" if last else buf[carry_from:]
+            st.busy += time.perf_counter() - t
+        if batch:
+            self._put(q_out, (seq, batch), st)
+        for _ in range(self.parser_threads):
+            self._put(q_out, _DONE, st)
+
+    def _parser(self, q_in: queue.Queue, q_out: queue.Queue) -> None:
+        st = self.stats["parser"]
+        while True:
+            item = self._get(q_in, st)
+            if item is _DONE:
+                break
+            t = time.perf_counter()
+            seq, batch = item
+            out = [
+                (file_id, parse_hand(raw, stats=False) if raw is not None else None, end)
+                for file_id, raw, end in batch
+            ]
+            st.items += len(out)
+            st.busy += time.perf_counter() - t
+            self._put(q_out, (seq, out), st)
+        self._put(q_out, _DONE, st)
+
+    def _stats_stage(self, q_in: queue.Queue, q_out: queue.Queue) -> None:
+        st = self.stats["stats"]
+        expected = 0
+        waiting: Dict[int, List[Tuple[int, Any, int]]] = {}
+        done = 0
+        while done < self.parser_threads:
+            item = self._get(q_in, st)
+            if item is _DONE:
+                done += 1
+                continue
+            seq, batch = item
+            waiting[seq] = batch
+            while expected in waiting:
+                batch = waiting.pop(expected)
+                expected += 1
+                t = time.perf_counter()
+                for _, hand, _ in batch:
+                    if hand is not None:
+                        add_stats(hand)
+                st.items += len(batch)
+                st.busy += time.perf_counter() - t
+                self._put(q_out, batch, st)
+        self._put(q_out, _DONE, st)
+
+    def _write(self, q_in: queue.Queue) -> None:
+        st = self.stats["writer"]
+        writer = self.writer
+        poll_s = writer.max_latency_ms / 1000.0
+        while True:
+            t = time.perf_counter()
+            try:
+                batch = q_in.get(timeout=poll_s)
+            except queue.Empty:
+                st.wait_in += time.perf_counter() - t
+                if self._stop.is_set():
+                    return  # fallo una etapa de arriba
+                t = time.perf_counter()
+                writer.poll()
+                st.busy += time.perf_counter() - t
+                continue
+            st.wait_in += time.perf_counter() - t
+            if batch is _DONE:
+                break
+            t = time.perf_counter()
+            for file_id, hand, end in batch:
+                if hand is None:
+                    writer.checkpoint(file_id, end)
+                else:
+                    writer.add(file_id, hand, end)
+            st.items += len(batch)
+            st.busy += time.perf_counter() - t
+        t = time.perf_counter()
+        writer.flush()
+        st.busy += time.perf_counter() - t
+
+    # --- colas ---
+
+    def _guard(self, fn: Callable[..., None], *args: Any) -> None:
+        try:
+            fn(*args)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _put(self, q: queue.Queue, item: Any, st: StageStats) -> None:
+        t = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Stopped()
+        st.wait_out += time.perf_counter() - t
+        st.sample(q)
+
+    def _get(self, q: queue.Queue, st: StageStats) -> Any:
+        t = time.perf_counter()
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Stopped()
+        st.wait_in += time.perf_counter() - t
+        return item
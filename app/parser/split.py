@@ -0,0 +1,111 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union, BinaryIO
+import mmap
+
+BOM = b"\xef\xbb\xbf"
+HAND_START = b"PokerStars Hand #"
+HAND_MARK = b"\n" + HAND_START
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
+
+
+@contextmanager
+def map_file(src: Union[str, Path, BinaryIO]) -> Iterator[Buffer]:
+    """
+    Mapea el archivo en memoria (solo lectura). Acepta un path o un archivo
+    ya abierto en modo binario. Un archivo vacio no se puede mapear, en ese
+    caso se entrega b"".
+    """
+    if isinstance(src, (str, Path)):
+        with open(src, "rb") as f:
+            with map_file(f) as mm:
+                yield mm
+        return
+    try:
+        mm = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        yield b""
+        return
+    try:
+        yield mm
+    finally:
+        mm.close()
+
+
+def _first_hand_start(buf: Buffer, start: int, end: int) -> int:
+    if start == 0 and buf[:len(BOM)] == BOM:
+        start = len(BOM)
+    if buf[start:start + len(HAND_START)] == HAND_START:
+        return start
+    i = buf.find(HAND_MARK, start, end)
+    return -1 if i == -1 else i + 1
+
+
+def hand_no_of(raw: Union[bytes, memoryview]) -> Optional[int]:
+    """
+    hand_no leido directo de los bytes del header, sin parsear la mano.
+    """
+    head = bytes(raw[:48])
+    if head.startswith(BOM):
+        head = head[len(BOM):]
+    if not head.startswith(HAND_START):
+        return None
+    j = head.find(b":", len(HAND_START))
+    digits = head[len(HAND_START):j]
+    if j == -1 or not digits.isdigit():
+        return None
+    return int(digits)
+
+
+def iter_hand_bounds(buf: Buffer, start: int = 0, end: Optional[int] = None, final: bool = True) -> Iterator[Tuple[int, int]]:
+    """
+    Recorre buf[start:end] buscando b"\\nPokerStars Hand #" y devuelve los
+    (inicio, fin) de cada mano. El fin de una mano es el inicio de la
+    siguiente. Con final=False la ultima mano (que puede estar incompleta)
+    no se devuelve: queda como carry desde el ultimo fin.
+    """
+    end = len(buf) if end is None else end
+    a = _first_hand_start(buf, start, end)
+    if a == -1:
+        return
+    while True:
+        i = buf.find(HAND_MARK, a, end)
+        if i == -1:
+            break
+        yield a, i + 1
+        a = i + 1
+    if final and a < end:
+        yield a, end
+
+
+def iter_hand_views(buf: Buffer, start: int = 0, end: Optional[int] = None, final: bool = True) -> Iterator[Tuple[memoryview, int]]:
+    """
+    Igual que iter_hand_bounds pero entrega un memoryview de cada mano (sin
+    copiar) y su offset final. La vista solo es valida hasta pedir la
+    siguiente: despues se libera para que el mmap se pueda cerrar.
+    """
+    mv = memoryview(buf)
+    try:
+        for a, b in iter_hand_bounds(buf, start, end, final):
+            view = mv[a:b]
+            try:
+                yield view, b
+            finally:
+                view.release()
+    finally:
+        mv.release()
+
+
+def split_hands(buf: Buffer) -> Tuple[List[memoryview], bytes]:
+    """
+    Separa las manos completas de buf. La ultima mano queda como carry
+    (bytes) porque todavia puede estar escribiendose.
+    """
+    bounds = list(iter_hand_bounds(buf, 0, final=False))
+    if not bounds:
+        return [], bytes(buf)
+    mv = memoryview(buf)
+    hands = [mv[a:b] for a, b in bounds]
+    return hands, bytes(buf[bounds[-1][1]:])
@@ -441,10 +441,17 @@ ApplicationWindow {
                                     spacing: 8
 
                                     Label { text: "Manos parseadas"; font.pixelSize: 14; opacity: 0.75 }
-                                    Label { text: handsParsed.toString(); font.pixelSize: 38; font.bold: true }
+                                    Label { text: appSettings.handsImported.toString(); font.pixelSize: 38; font.bold: true }
                                     Item { Layout.fillHeight: true }
                                     Label {
-                                        text: "Simula el estado del parser."
+                                        text: appSettings.handsPerSecond.toFixed(0) + " manos/s · "
+                                              + appSettings.filesPending + " archivos pendientes"
+                                        font.pixelSize: 12
+                                        opacity: 0.6
+                                    }
+                                    Label {
+                                        text: "En vivo: " + appSettings.liveDepth + " (" + appSettings.liveLatencyMs.toFixed(0) + " ms) · "
+                                              + "Historial: " + appSettings.bulkDepth + " (" + (appSettings.bulkLatencyMs / 1000).toFixed(1) + " s)"
                                         font.pixelSize: 12
                                         opacity: 0.6
                                     }
@@ -0,0 +1,115 @@
+from __future__ import annotations
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(slots=True)
+class _Tail:
+    interval: float
+    last_growth: float
+    due: Optional[float] = None
+
+
+class TailScheduler:
+    """
+    Cola de prioridad (heap por proximo vencimiento) de los archivos que se
+    estan siguiendo. Una mesa que acaba de recibir una mano se vuelve a
+    mirar en min_interval; cada visita sin cambios duplica el intervalo
+    hasta max_interval, y si pasan dormant_seconds sin crecer el archivo
+    sale de la cola hasta que algo lo despierte (watchdog o el indice de
+    la carpeta).
+
+    Si el archivo tiene una mano en el carry, el vencimiento nunca pasa de
+    flush_at: el flush por inactividad sale de los mismos timers.
+    """
+
+    def __init__(
+            self,
+            min_interval: float = 0.25,
+            max_interval: float = 8.0,
+            dormant_seconds: float = 300.0,
+            backoff: float = 2.0,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.dormant_seconds = dormant_seconds
+        self.backoff = backoff
+        self._tails: Dict[str, _Tail] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._tails)
+
+    def __contains__(self, path_str: str) -> bool:
+        return path_str in self._tails
+
+    def wake(self, path_str: str, now: float) -> None:
+        """
+        El archivo cambio (o puede haber cambiado): se visita ya y vuelve
+        al intervalo minimo.
+        """
+        tail = self._tails.get(path_str)
+        if tail is None:
+            tail = self._tails[path_str] = _Tail(self.min_interval, now)
+        else:
+            tail.interval = self.min_interval
+            tail.last_growth = now
+        self._push(path_str, tail, now)
+
+    def record(self, path_str: str, grew: bool, now: float, flush_at: Optional[float] = None) -> None:
+        """
+        Resultado de una visita: reprograma el archivo (o lo deja dormido).
+        """
+        tail = self._tails.get(path_str)
+        if tail is None:
+            tail = self._tails[path_str] = _Tail(self.min_interval, now)
+        if grew:
+            tail.interval = self.min_interval
+            tail.last_growth = now
+        else:
+            tail.interval = min(tail.interval * self.backoff, self.max_interval)
+            if flush_at is None and now - tail.last_growth >= self.dormant_seconds:
+                self.forget(path_str)
+                return
+        due = now + tail.interval
+        if flush_at is not None:
+            due = min(due, flush_at)
+        self._push(path_str, tail, due)
+
+    def forget(self, path_str: str) -> None:
+        # la entrada del heap queda y se descarta al salir
+        self._tails.pop(path_str, None)
+
+    def pop_due(self, now: float) -> List[Tuple[str, float]]:
+        """
+        Saca los archivos vencidos (path, vencimiento), del mas atrasado al
+        mas nuevo. Cada uno tiene que volver con record() (o forget()).
+        """
+        due: List[Tuple[str, float]] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            ts, path_str = heapq.heappop(heap)
+            tail = self._tails.get(path_str)
+            if tail is None or tail.due != ts:
+                continue  # reprogramado u olvidado
+            tail.due = None
+            due.append((path_str, ts))
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """
+        Proximo vencimiento (timestamp) o None si no hay nada en la cola.
+        """
+        heap = self._heap
+        while heap:
+            ts, path_str = heap[0]
+            tail = self._tails.get(path_str)
+            if tail is not None and tail.due == ts:
+                return ts
+            heapq.heappop(heap)
+        return None
+
+    def _push(self, path_str: str, tail: _Tail, due: float) -> None:
+        tail.due = due
+        heapq.heappush(self._heap, (due, path_str))
@@ -25,6 +25,10 @@ CREATE TABLE IF NOT EXISTS hands(
   stakes TEXT,
   buyin INTEGER,
   currency TEXT, 
+  -- montos de la mano (chips, posts, acciones, result) en enteros:
+  -- valor real = monto / money_scale. 100 en cash, 1 en torneos. Las manos
+  -- de antes de la columna quedan con 1 (se guardaban sin centavos).
+  money_scale INTEGER NOT NULL DEFAULT 1,
 
   btn_pos INTEGER NOT NULL,
   max_seats INTEGER NOT NULL,
@@ -76,7 +80,7 @@ CREATE TABLE IF NOT EXISTS result(
   hand_id INTEGER NOT NULL,
   player_id INTEGER NOT NULL,
   cards TEXT NOT NULL,
-  collected NOT NULL,
+  collected INTEGER NOT NULL,
 
   PRIMARY KEY(hand_id, player_id),
   FOREIGN KEY(hand_id) REFERENCES hands(id) ON DELETE CASCADE,
@@ -125,6 +129,34 @@ CREATE TABLE IF NOT EXISTS actions(
   UNIQUE(hand_id, seq)
 );
 
+-- modo empaquetado (counters 'packed_actions' = 1): las acciones de cada
+-- mano van en un solo BLOB en vez de una fila por accion en actions (formato
+-- en database/packed.py). Una mano esta en una tabla o en la otra, nunca en
+-- las dos; v_actions las junta con las columnas de actions.
+CREATE TABLE IF NOT EXISTS hand_actions (
+  hand_id INTEGER PRIMARY KEY,
+  actions BLOB NOT NULL,
+  FOREIGN KEY(hand_id) REFERENCES hands(id) ON DELETE CASCADE
+);
+
+-- unpack_actions() es una funcion Python (packed.register_functions): la
+-- vista solo se puede consultar desde conexiones abiertas por DB / ReadPool.
+-- Desde otra conexion (la consola sqlite3, otro programa) da "no such
+-- function: unpack_actions" aunque la BD no use el modo empaquetado: hay que
+-- llamar antes a register_functions(conn), o leer actions y hand_actions
+-- directo (el BLOB se decodifica con packed.unpack_actions). Decodificarlo en
+-- SQL puro (hex + substr) medido: ~x8 mas lento y sin poder filtrar por
+-- hand_id antes de decodificar, por eso no hay vista sin la funcion.
+CREATE VIEW IF NOT EXISTS v_actions AS
+  SELECT hand_id, seq, street, player_id, action, amount, raise_from, raise_to, is_allin
+  FROM actions
+  UNION ALL
+  SELECT p.hand_id, j.key + 1,
+    json_extract(j.value, '$[0]'), json_extract(j.value, '$[1]'), json_extract(j.value, '$[2]'),
+    json_extract(j.value, '$[3]'), json_extract(j.value, '$[4]'), json_extract(j.value, '$[5]'),
+    json_extract(j.value, '$[6]')
+  FROM hand_actions p, json_each(unpack_actions(p.actions)) j;
+
 CREATE TABLE IF NOT EXISTS hole_cards (
   hand_id INTEGER,
   player_id INTEGER,
@@ -217,6 +249,52 @@ CREATE TABLE IF NOT EXISTS player_stats (
 );
 
 
+-- una fila por (mano, jugador) con los contadores de PlayerStats de esa mano
+-- empaquetados en bits (ver database/facts.py). Sirve para los filtros que
+-- player_stats no puede responder (fechas, stakes, cash/torneo, rivales).
+-- hand_ts, stakes e is_tournament se copian de hands para no tener que
+-- hacer JOIN; la PK agrupa las manos de cada jugador por fecha.
+CREATE TABLE IF NOT EXISTS hand_player_facts (
+  player_id INTEGER NOT NULL,
+  hand_ts INTEGER NOT NULL,
+  hand_id INTEGER NOT NULL,
+  stakes TEXT,
+  is_tournament INTEGER NOT NULL,
+  pos INTEGER,
+  players_seated INTEGER,
+  stack_bb_bucket INTEGER,
+  pre_flags INTEGER NOT NULL,
+  post_flags INTEGER NOT NULL,
+  PRIMARY KEY(player_id, hand_ts, hand_id)
+) WITHOUT ROWID;
+
+-- recalculo de player_stats / hand_player_facts en curso (ver
+-- database/rebuild.py): hasta que mano se proceso. La fila existe solo
+-- mientras dura el rebuild; si el proceso se corta, se sigue desde aca.
+CREATE TABLE IF NOT EXISTS rebuild_state (
+  name TEXT PRIMARY KEY,
+  last_hand_id INTEGER NOT NULL,
+  total_hands INTEGER NOT NULL,
+  started_at REAL NOT NULL
+);
+
+-- contadores mantenidos en la misma transaccion que los INSERT (count_hands
+-- sin recorrer la tabla). Se siembran con count(*) la primera vez.
+CREATE TABLE IF NOT EXISTS counters (
+  name TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
+INSERT INTO counters(name, value)
+  SELECT 'hands', (SELECT count(*) FROM hands)
+  WHERE NOT EXISTS (SELECT 1 FROM counters WHERE name = 'hands');
+-- generation: cantidad de COMMITs con manos nuevas (ver DB.add_commit_listener)
+INSERT OR IGNORE INTO counters(name, value) VALUES ('generation', 0);
+-- packed_actions: 1 = las manos nuevas guardan sus acciones en hand_actions
+INSERT OR IGNORE INTO counters(name, value) VALUES ('packed_actions', 0);
+-- stats_version: version de parse_stats de player_stats y hand_player_facts
+-- (la agrega DB._migrate, ver STATS_VERSION)
+
+
 CREATE INDEX IF NOT EXISTS idx_hands_file ON hands(file_id);
 CREATE INDEX IF NOT EXISTS idx_hands_tournament ON hands(tournament_id);
 CREATE INDEX IF NOT EXISTS idx_actions_hand ON actions(hand_id);
@@ -224,3 +302,5 @@ CREATE INDEX IF NOT EXISTS idx_actions_player ON actions(player_id);
 CREATE INDEX IF NOT EXISTS idx_stats_player ON player_stats(player_id);
 CREATE INDEX IF NOT EXISTS idx_stats_pos ON player_stats(pos);
 CREATE INDEX IF NOT EXISTS idx_stats_stack ON player_stats(stack_bb_bucket);
+CREATE INDEX IF NOT EXISTS idx_facts_stakes ON hand_player_facts(stakes, hand_ts);
+CREATE INDEX IF NOT EXISTS idx_facts_hand ON hand_player_facts(hand_id);
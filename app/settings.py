@@ -4,24 +4,89 @@ from PySide6.QtCore import QObject, Property, Signal, Slot
 class MockSettings(QObject):
 
     handsCountChanged = Signal()
+    importProgressChanged = Signal()
 
     def __init__(self, db):
         super().__init__()
         self._username = ""
         self._db = db
         self._hands_count = 0
+        # generacion del ultimo COMMIT avisado y de la ultima consulta
+        self._generation = 0
+        self._refreshed_generation = -1
+        self._hands_imported = 0
+        self._files_pending = 0
+        self._hands_per_second = 0.0
+        self._live_depth = 0
+        self._bulk_depth = 0
+        self._live_latency_ms = 0.0
+        self._bulk_latency_ms = 0.0
 
     def getHandsCount(self) -> int:
         return self._hands_count
     @Slot()
     def refresh(self) -> None:
+        # sin COMMITs nuevos no hay nada que volver a consultar
+        if self._generation == self._refreshed_generation:
+            return
+        self._refreshed_generation = self._generation
         new_val = self._db.count_hands()
         if new_val != self._hands_count:
             self._hands_count = new_val
             self.handsCountChanged.emit()
 
+    @Slot(object)
+    def onImportCommit(self, commit) -> None:
+        # llega desde el hilo del importer; el timer de refresh junta los
+        # commits de un segundo en una sola consulta
+        self._generation = commit.generation
+
+    @Slot(int, int, float)
+    def onImportProgress(self, hands_imported: int, files_pending: int, hands_per_second: float) -> None:
+        # llega desde el hilo del importer (conexion encolada)
+        self._hands_imported = hands_imported
+        self._files_pending = files_pending
+        self._hands_per_second = hands_per_second
+        self.importProgressChanged.emit()
+
+    @Slot(int, int, float, float)
+    def onImportLanes(self, live_depth: int, bulk_depth: int, live_latency_ms: float, bulk_latency_ms: float) -> None:
+        self._live_depth = live_depth
+        self._bulk_depth = bulk_depth
+        self._live_latency_ms = live_latency_ms
+        self._bulk_latency_ms = bulk_latency_ms
+        self.importProgressChanged.emit()
+
+    def getHandsImported(self) -> int:
+        return self._hands_imported
+
+    def getFilesPending(self) -> int:
+        return self._files_pending
+
+    def getHandsPerSecond(self) -> float:
+        return self._hands_per_second
+
+    def getLiveDepth(self) -> int:
+        return self._live_depth
+
+    def getBulkDepth(self) -> int:
+        return self._bulk_depth
+
+    def getLiveLatencyMs(self) -> float:
+        return self._live_latency_ms
+
+    def getBulkLatencyMs(self) -> float:
+        return self._bulk_latency_ms
+
     @Slot(str)
     def log(self, msg: str):
         print("[QML]", msg)
 
-    handsCount = Property(int, getHandsCount, notify=handsCountChanged)
\ No newline at end of file
+    handsCount = Property(int, getHandsCount, notify=handsCountChanged)
+    handsImported = Property(int, getHandsImported, notify=importProgressChanged)
+    filesPending = Property(int, getFilesPending, notify=importProgressChanged)
+    handsPerSecond = Property(float, getHandsPerSecond, notify=importProgressChanged)
+    liveDepth = Property(int, getLiveDepth, notify=importProgressChanged)
+    bulkDepth = Property(int, getBulkDepth, notify=importProgressChanged)
+    liveLatencyMs = Property(float, getLiveLatencyMs, notify=importProgressChanged)
+    bulkLatencyMs = Property(float, getBulkLatencyMs, notify=importProgressChanged)
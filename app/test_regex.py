@@ -34,7 +34,7 @@ def main():
     hh_folder = Path(HH_FOLDER)
     
     #Parseo
-    parse_files(hh_folder, database)
+    parse_files(hh_folder, database, workers=os.cpu_count() or 1)
 
     QQuickStyle.setStyle("Fusion")  # o "Material" si te gusta
     app = QGuiApplication(sys.argv)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # sin watchdog el importer sigue por polling
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _TxtEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "FolderWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def _touch(self, path: str) -> None:
+        if path.lower().endswith(".txt"):
+            self.watcher.touch(path)
+
+    def on_created(self, event) -> None:
+        if not event.is_directory:
+            self._touch(event.src_path)
+
+    def on_modified(self, event) -> None:
+        if not event.is_directory:
+            self._touch(event.src_path)
+
+    def on_moved(self, event) -> None:
+        if not event.is_directory:
+            self._touch(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    Marca los .txt de la carpeta que cambian segun las notificaciones del
+    sistema de archivos (watchdog). Cada archivo tiene su debounce: solo se
+    entrega cuando paso debounce_ms desde su ultimo evento, asi una mano
+    escrita en varios write() se lee de una vez.
+    """
+
+    def __init__(self, folder: str | Path, debounce_ms: int = 30):
+        self.folder = Path(folder)
+        self.debounce_ms = debounce_ms
+        self._dirty: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._observer = None
+
+    @property
+    def running(self) -> bool:
+        return self._observer is not None
+
+    def start(self) -> bool:
+        """
+        Arranca el observer. Devuelve False si watchdog no esta disponible
+        o la carpeta no existe (el importer vuelve a polling).
+        """
+        if self._observer is not None:
+            return True
+        if Observer is None or not self.folder.is_dir():
+            return False
+        observer = Observer()
+        observer.schedule(_TxtEventHandler(self), str(self.folder), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def stop(self) -> None:
+        if self._observer is None:
+            return
+        self._observer.stop()
+        self._observer.join(timeout=2)
+        self._observer = None
+
+    def touch(self, path: str) -> None:
+        # lo llama el hilo de watchdog
+        with self._lock:
+            self._dirty[path] = time.monotonic()
+        self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty)
+
+    def pop_ready(self) -> List[str]:
+        """
+        Saca y devuelve los archivos cuyo ultimo evento ya supero el debounce.
+        """
+        limit = time.monotonic() - self.debounce_ms / 1000.0
+        with self._lock:
+            ready = [p for p, ts in self._dirty.items() if ts <= limit]
+            for p in ready:
+                del self._dirty[p]
+            if not self._dirty:
+                self._wake.clear()
+        return ready
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloquea hasta que haya algun evento pendiente (o timeout).
+        """
+        return self._wake.wait(timeout)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Slot, Qt, QMetaObject
+
+from .database.db import DB, ImportCommit
+from .importer import HandHistoryImporter, ImportProgress
+
+EVENT_TICK_MS = 25
+POLL_TICK_MS = 1000
+MIN_TICK_MS = 10
+
+
+class ImportWorker(QObject):
+    """
+    Corre el HandHistoryImporter fuera del hilo de la GUI. Desde que arranca,
+    la conexion writer del DB es de este hilo; la UI lee con db.reader() y
+    el progreso le llega por signals.
+    """
+
+    # manos importadas, archivos pendientes, manos/s
+    progress = Signal(int, int, float)
+    # por carril (vivo / historial): archivos en cola y latencia en ms
+    lanes = Signal(int, int, float, float)
+    # ImportCommit de cada COMMIT con manos nuevas
+    committed = Signal(object)
+    finished = Signal()
+
+    def __init__(self, db: DB, folder: str | Path, **importer_kwargs):
+        super().__init__()
+        self.db = db
+        self.folder = folder
+        self.importer_kwargs = importer_kwargs
+        self._importer: HandHistoryImporter | None = None
+        self._timer: QTimer | None = None
+
+    @Slot()
+    def start(self) -> None:
+        self.db.add_commit_listener(self._on_commit)
+        self._importer = HandHistoryImporter(
+            db=self.db,
+            folder=self.folder,
+            on_progress=self._on_progress,
+            **self.importer_kwargs,
+        )
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+        self._timer.start(0)
+
+    @Slot()
+    def _tick(self) -> None:
+        self._importer.tick()
+        # con watchdog el tick solo mira la cola de eventos: puede ir mucho mas seguido
+        interval = EVENT_TICK_MS if self._importer.watching else POLL_TICK_MS
+        # y si una mesa activa vence antes, se adelanta el timer
+        due = self._importer.seconds_until_due()
+        if due is not None:
+            interval = max(MIN_TICK_MS, min(interval, int(due * 1000)))
+        self._timer.setInterval(interval)
+
+    def _on_progress(self, p: ImportProgress) -> None:
+        self.progress.emit(p.hands_imported, p.files_pending, p.hands_per_second)
+        self.lanes.emit(p.live.depth, p.bulk.depth, p.live.latency_ms, p.bulk.latency_ms)
+
+    def _on_commit(self, commit: ImportCommit) -> None:
+        self.committed.emit(commit)
+
+    def request_stop(self) -> None:
+        # se llama desde el hilo de la GUI: corta un barrido largo en curso
+        if self._importer is not None:
+            self._importer.stop_requested = True
+
+    @Slot()
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+        if self._importer is not None:
+            self._importer.close()
+        self.db.remove_commit_listener(self._on_commit)
+        self.finished.emit()
+
+
+def start_import_thread(worker: ImportWorker) -> QThread:
+    thread = QThread()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.start)
+    thread.start()
+    return thread
+
+
+def stop_import_thread(worker: ImportWorker, thread: QThread) -> None:
+    worker.request_stop()
+    QMetaObject.invokeMethod(worker, "stop", Qt.BlockingQueuedConnection)
+    thread.quit()
+    thread.wait()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# los tests importan app.* desde la raiz del repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,99 @@
+"""
+Manos de PokerStars armadas a mano para los tests.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable
+
+SIMPLE_HAND = """\
+PokerStars Hand #{no}:  Hold'em No Limit ($0.01/$0.02 USD) - 2024/01/15 19:27:10 CET [2024/01/15 14:31:45 ET]
+Table 'Aase II' 6-max Seat #3 is the button
+Seat 1: sunbreathking ($1.37 in chips)
+Seat 2: player0311 ($0.72 in chips)
+Seat 3: player0390 ($1.82 in chips)
+Seat 4: player0392 ($0.35 in chips)
+Seat 5: player0001 ($0.31 in chips)
+player0392: posts small blind $0.01
+player0001: posts big blind $0.02
+*** HOLE CARDS ***
+Dealt to sunbreathking [Ah Kd]
+sunbreathking: folds
+player0311: calls $0.02
+player0390: folds
+player0392: folds
+player0001: checks
+*** FLOP *** [2c 7d Jh]
+player0311: checks
+player0001: checks
+*** TURN *** [2c 7d Jh] [Qs]
+player0311: checks
+player0001: checks
+*** RIVER *** [2c 7d Jh Qs] [3h]
+player0311: checks
+player0001: checks
+*** SHOW DOWN ***
+player0311: shows [Tc Td] (a pair of Tens)
+player0001: shows [9c 9d] (a pair of Nines)
+player0311 collected $0.05 from pot
+*** SUMMARY ***
+Total pot $0.05 | Rake 0
+Seat 1: sunbreathking folded before Flop
+Seat 2: player0311 showed [Tc Td] and won ($0.05) with a pair of Tens
+Seat 3: player0390 folded before Flop
+Seat 4: player0392 folded before Flop
+Seat 5: player0001 showed [9c 9d] and lost with a pair of Nines
+"""
+
+# flop: check-raise y otra subida del mismo jugador; river: bet, raise, re-raise
+MULTI_RAISE_HAND = """\
+PokerStars Hand #{no}:  Hold'em No Limit ($0.01/$0.02 USD) - 2024/01/15 19:30:10 CET [2024/01/15 14:34:45 ET]
+Table 'Aase II' 6-max Seat #3 is the button
+Seat 1: sunbreathking ($5.00 in chips)
+Seat 2: player0311 ($5.00 in chips)
+Seat 3: player0390 ($5.00 in chips)
+Seat 4: player0392 ($5.00 in chips)
+player0392: posts small blind $0.01
+sunbreathking: posts big blind $0.02
+*** HOLE CARDS ***
+Dealt to sunbreathking [Ah Kd]
+player0311: raises $0.04 to $0.06
+player0390: calls $0.06
+player0392: folds
+sunbreathking: calls $0.04
+*** FLOP *** [2c 7d Jh]
+sunbreathking: checks
+player0311: bets $0.10
+player0390: folds
+sunbreathking: raises $0.20 to $0.30
+player0311: raises $0.50 to $0.80
+sunbreathking: raises $1.20 to $2.00
+player0311: calls $1.20
+*** TURN *** [2c 7d Jh] [Qs]
+sunbreathking: checks
+player0311: checks
+*** RIVER *** [2c 7d Jh Qs] [3h]
+sunbreathking: bets $0.50
+player0311: raises $0.50 to $1.00
+sunbreathking: raises $1.00 to $2.00
+player0311: calls $1.00
+*** SHOW DOWN ***
+sunbreathking: shows [Ah Kd] (high card Ace)
+player0311: shows [Tc Td] (a pair of Tens)
+player0311 collected $7.99 from pot
+*** SUMMARY ***
+Total pot $8.19 | Rake $0.20
+Seat 1: sunbreathking (big blind) showed [Ah Kd] and lost with high card Ace
+Seat 2: player0311 showed [Tc Td] and won ($7.99) with a pair of Tens
+Seat 3: player0390 (button) folded on the Flop
+Seat 4: player0392 (small blind) folded before Flop
+"""
+
+
+def hand_text(template: str, no: int) -> str:
+    return template.format(no=no)
+
+
+def write_hh(path: Path, hands: Iterable[str]) -> Path:
+    # los archivos de PokerStars separan las manos con lineas en blanco
+    path.write_text("\n\n\n".join(hands) + "\n\n\n", encoding="utf-8")
+    return path
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from app.database.db import DB
+from app.database.writer import HandWriter
+from app.parser.binfmt import HandStore, StoreReader, decode_compact, encode_hand
+from app.parser.parse_hand import parse_hand
+from hands import MULTI_RAISE_HAND, SIMPLE_HAND, hand_text
+
+
+def test_reader_keeps_last_copy(tmp_path):
+    path = tmp_path / "hands.bin"
+    a = parse_hand(hand_text(SIMPLE_HAND, 300000000001).encode(), stats=False)
+    b = parse_hand(hand_text(MULTI_RAISE_HAND, 300000000002).encode(), stats=False)
+    b2 = parse_hand(hand_text(MULTI_RAISE_HAND, 300000000003).encode(), stats=False)
+    store = HandStore(path)
+    store.append(1, 100, a)
+    store.append(1, 200, b)
+    # la misma clave otra vez: vale la ultima copia
+    store.append(1, 200, b2)
+    store.close()
+
+    reader = StoreReader(path)
+    try:
+        got = [(f, e, h.hand_id) for f, e, h in reader]
+        assert got == [(1, 100, a.hand_id), (1, 200, b2.hand_id)]
+        assert reader.get(1, 200).hand_id == b2.hand_id
+    finally:
+        reader.close()
+
+
+def test_decode_compact_matches_hand():
+    hand = parse_hand(hand_text(MULTI_RAISE_HAND, 300000000004).encode(), stats=False)
+    hand_no, max_seats, btn, stakes, is_tournament, local_dt, seats, posts, actions, results = decode_compact(encode_hand(hand))
+    assert (hand_no, max_seats, btn, stakes, local_dt) == (hand.hand_id, hand.max_seats, hand.button_pos, hand.stakes, hand.local_dt)
+    assert is_tournament == (1 if hand.tournament_id else 0)
+    assert seats == [(int(s.pos), s.player_name, s.chips, int(s.sitting_out)) for s in hand.seats]
+    assert posts == [(p.player_name, p.kind, p.amount) for p in hand.posts]
+    assert actions == [(a.street, a.player_name, a.action) for a in hand.actions]
+    assert results == [(r.player_name, r.collected) for r in hand.results]
+
+
+def test_writer_stores_only_committed_hands(tmp_path, monkeypatch):
+    db = DB(tmp_path / "poker.sqlite3")
+    store = HandStore(tmp_path / "hands.bin")
+    try:
+        db.upsert_file("hh.txt", 0.0, 0)
+        file_id, _ = db.get_file_state("hh.txt")
+        writer = HandWriter(db, store=store)
+        writer.add(file_id, parse_hand(hand_text(SIMPLE_HAND, 300000000005).encode()), end_offset=100)
+        insert = db.insert_hands
+
+        def busy(batch, offsets=None):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(db, "insert_hands", busy)
+        with pytest.raises(sqlite3.OperationalError):
+            writer.flush()
+        assert store.appended == 0
+
+        monkeypatch.setattr(db, "insert_hands", insert)
+        assert writer.flush() == 1
+        assert store.appended == 1
+    finally:
+        store.close()
+        db.close()
@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+from app.database.db import DB
+from app.parser.parse_hand import parse_hand
+from hands import SIMPLE_HAND, hand_text
+
+
+def test_player_created_by_other_writer(tmp_path):
+    path = tmp_path / "poker.sqlite3"
+    a, b = DB(path), DB(path)
+    try:
+        with b.transaction():
+            created = b.get_player_ids(["newguy"])["newguy"]
+        # el cache de A esta completo pero no conoce a newguy
+        with a.transaction():
+            ids = a.get_player_ids(["newguy", "other"])
+        assert ids["newguy"] == created
+        assert a.conn.execute("SELECT count(*) FROM players").fetchone()[0] == 2
+    finally:
+        a.close()
+        b.close()
+
+
+def test_failed_commit_rolls_back(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction() as conn:
+                # la FK diferida recien se controla en el COMMIT
+                conn.execute("PRAGMA defer_foreign_keys = ON")
+                ghost = db.get_player_ids(["ghost"])["ghost"]
+                conn.execute("INSERT INTO seats(hand_id, pos, player_id) VALUES (999, 1, ?)", (ghost,))
+        assert not db.conn.in_transaction
+        assert db._uncommitted_players == [] and db._uncommitted_hands == []
+        assert db.player_cache.get("ghost") is None
+        # la siguiente transaccion es nueva, no se suma a la que fallo
+        with db.transaction():
+            db.get_player_ids(["alive"])
+        names = [r[0] for r in db.conn.execute("SELECT player_name FROM players")]
+        assert names == ["alive"]
+    finally:
+        db.close()
+
+
+def _file(db: DB) -> int:
+    db.upsert_file("hh.txt", 0.0, 0)
+    return db.get_file_state("hh.txt")[0]
+
+
+def _hand(no: int):
+    return parse_hand(hand_text(SIMPLE_HAND, no).encode())
+
+
+def test_generation_only_on_commits_with_hands(tmp_path):
+    path = tmp_path / "poker.sqlite3"
+    db = DB(path)
+    commits = []
+    db.add_commit_listener(commits.append)
+    try:
+        file_id = _file(db)
+        start = db.generation
+        with db.transaction():
+            db.get_player_ids(["someone"])
+        assert db.generation == start and commits == []
+
+        db.insert_hands([(file_id, _hand(310000000001)), (file_id, _hand(310000000002))])
+        assert db.generation == start + 1
+        assert [c.hands for c in commits] == [2] and commits[0].generation == start + 1
+
+        # solo repetidas: no hay manos nuevas
+        db.insert_hands([(file_id, _hand(310000000001))])
+        assert db.generation == start + 1 and len(commits) == 1
+    finally:
+        db.close()
+    db = DB(path)
+    try:
+        assert db.generation == start + 1
+    finally:
+        db.close()
+
+
+def test_no_listener_after_rollback(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    commits = []
+    db.add_commit_listener(commits.append)
+    try:
+        file_id = _file(db)
+        start = db.generation
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.insert_hands([(file_id, _hand(320000000001))])
+                raise RuntimeError("corte")
+        # el COMMIT falla despues de insertar la mano
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction() as conn:
+                conn.execute("PRAGMA defer_foreign_keys = ON")
+                db.insert_hands([(file_id, _hand(320000000002))])
+                conn.execute("INSERT INTO seats(hand_id, pos, player_id) VALUES (999, 1, 1)")
+        assert commits == []
+        assert db.generation == start
+        assert db.conn.execute("SELECT value FROM counters WHERE name = 'generation'").fetchone()[0] == start
+        assert db.count_hands() == 0
+        # las manos que no quedaron se pueden volver a importar
+        assert len(db.insert_hands([(file_id, _hand(320000000001)), (file_id, _hand(320000000002))])) == 2
+        assert [c.generation for c in commits] == [start + 1]
+    finally:
+        db.close()
+
+
+def _indexes(db: DB) -> set:
+    return {r[0] for r in db.conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'")}
+
+
+def test_bulk_load_refuses_live_readers(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        indexes = _indexes(db)
+        with db.reader() as conn:
+            conn.execute("SELECT count(*) FROM hands").fetchone()
+        # el lector del pool sigue abierto: la BD no esta offline
+        with pytest.raises(RuntimeError, match="offline"):
+            with db.bulk_load():
+                pass
+        assert _indexes(db) == indexes
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] != 0
+        db.insert_hands([(_file(db), _hand(1))])
+        with db.reader() as conn:
+            assert conn.execute("SELECT count(*) FROM hands").fetchone()[0] == 1
+    finally:
+        db.close()
+
+
+def test_bulk_load_locks_out_other_connections(tmp_path):
+    path = tmp_path / "poker.sqlite3"
+    db = DB(path)
+    try:
+        indexes = _indexes(db)
+        file_id = _file(db)
+        with db.bulk_load():
+            db.insert_hands([(file_id, _hand(1))])
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                with pytest.raises(sqlite3.OperationalError, match="locked"):
+                    other.execute("SELECT count(*) FROM hands").fetchone()
+            finally:
+                other.close()
+        assert _indexes(db) == indexes
+        with db.reader() as conn:
+            assert conn.execute("SELECT count(*) FROM hands").fetchone()[0] == 1
+    finally:
+        db.close()
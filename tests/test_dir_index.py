@@ -0,0 +1,53 @@
+import os
+import time
+
+from app.dir_index import DirectoryIndex
+
+
+def _append(path, text: str, mtime: float) -> None:
+    with path.open("a") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_hot_tier_is_polled_cold_tier_waits_for_full_scan(tmp_path):
+    now = time.time()
+    hot, cold = tmp_path / "hot.txt", tmp_path / "cold.txt"
+    hot.write_text("a")
+    cold.write_text("a")
+    os.utime(hot, (now - 60, now - 60))
+    os.utime(cold, (now - 7200, now - 7200))
+
+    index = DirectoryIndex(tmp_path, cold_rescan_seconds=600)
+    cutoff = now - 3600
+    assert sorted(index.refresh(cutoff, now)) == sorted([str(hot), str(cold)])
+    assert index.full_scans == 1
+
+    # escribir no cambia el mtime del directorio: solo el tier caliente se ve
+    _append(hot, "b", now + 1)
+    _append(cold, "b", now - 7200)
+    stats = index.stats
+    assert index.refresh(cutoff, now + 2) == [str(hot)]
+    assert index.stats == stats + 1  # un stat: el archivo caliente
+    assert index.get(str(cold)).size == 1
+
+    # el barrido completo alcanza al frio
+    assert index.refresh(cutoff, now + 601) == [str(cold)]
+    assert index.get(str(cold)).size == 2
+    assert index.full_scans == 2
+
+
+def test_file_leaves_hot_tier_when_it_ages(tmp_path):
+    now = time.time()
+    path = tmp_path / "table.txt"
+    path.write_text("a")
+    os.utime(path, (now, now))
+    index = DirectoryIndex(tmp_path, cold_rescan_seconds=600)
+    index.refresh(now - 10, now)
+    stats = index.stats
+    index.refresh(now - 10, now + 1)
+    assert index.stats == stats + 1
+    # con el cutoff por delante del mtime se stat-ea una ultima vez y sale
+    index.refresh(now + 5, now + 2)
+    index.refresh(now + 5, now + 3)
+    assert index.stats == stats + 2
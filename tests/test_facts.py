@@ -0,0 +1,46 @@
+from app.database.db import DB
+from app.database.facts import FactFilter, fact_stats
+from app.parser.parse_hand import parse_hand
+from hands import MULTI_RAISE_HAND, SIMPLE_HAND, hand_text
+
+# columnas de player_stats que se llaman distinto en PlayerStats
+_RENAMED = {
+    "threebet": "three_bet",
+    "fourbet": "four_bet",
+    "fold_bb_vs_steal": "foldbb_vs_steal",
+    "cbet_flop": "c_bet",
+    "fold_to_cbet_flop": "fold_to_cbet",
+}
+_NOT_COUNTERS = {"player_id", "pos", "max_seats", "players_seated", "stack_bb_bucket", "vpip", "pfr"}
+
+
+def _stats_sums(db: DB) -> dict:
+    cols = [r[1] for r in db.conn.execute("PRAGMA table_info(player_stats)")]
+    cols = [c for c in cols if c not in _NOT_COUNTERS]
+    row = db.conn.execute("SELECT %s FROM player_stats" % ",".join("sum(%s)" % c for c in cols)).fetchone()
+    out = {}
+    for col, total in zip(cols, row):
+        base = col[:-4] if col.endswith("_opp") else col
+        name = _RENAMED.get(base, base) + col[len(base):]
+        out[name] = total
+    return out
+
+
+def test_fact_stats_match_player_stats(tmp_path):
+    hands = [parse_hand(hand_text(t, 280000000000 + i).encode()) for i, t in enumerate((MULTI_RAISE_HAND, SIMPLE_HAND))]
+    # check-raise y subidas repetidas en flop y river: 1 por mano
+    st = hands[0].stats["sunbreathking"]
+    assert (st.check_raise_flop, st.check_raise_flop_opp, st.river_bet) == (1, 1, 1)
+
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        db.upsert_file("hh.txt", 0.0, 0)
+        file_id, _ = db.get_file_state("hh.txt")
+        db.insert_hands([(file_id, h) for h in hands])
+        facts = fact_stats(db.conn, FactFilter())
+        sums = _stats_sums(db)
+        common = set(facts) & set(sums)
+        assert {"hands", "check_raise_flop", "check_raise_flop_opp", "river_bet"} <= common
+        assert {k: facts[k] for k in common} == {k: sums[k] for k in common}
+    finally:
+        db.close()
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+import app.importer as importer
+from app.database.db import DB
+from app.parser.binfmt import HandStore, StoreReader
+from hands import SIMPLE_HAND, hand_text, write_hh
+
+
+def test_hot_file_backlog_keeps_bulk_share(tmp_path, monkeypatch):
+    # bloques de ~2 manos: la mesa en juego tiene atrasado para muchas visitas
+    monkeypatch.setattr(importer, "READ_CHUNK", 3000)
+    folder = tmp_path / "hh"
+    folder.mkdir()
+    write_hh(folder / "live.txt", [hand_text(SIMPLE_HAND, 270000000000 + i) for i in range(60)])
+    old = write_hh(folder / "old.txt", [hand_text(SIMPLE_HAND, 270000001000 + i) for i in range(60)])
+    ts = time.time() - 3600
+    os.utime(old, (ts, ts))
+
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        imp = importer.HandHistoryImporter(db, folder, window_seconds=120, idle_flush_seconds=0)
+        imp.tick()
+        live, bulk = imp.progress.live, imp.progress.bulk
+        assert 0 < live.hands < 59
+        assert bulk.hands > 0
+        # la mesa vuelve a vencer ya, sin esperar min_interval
+        assert imp.scheduler.next_due() <= time.time()
+
+        deadline = time.time() + 20
+        while db.count_hands() < 120 and time.time() < deadline:
+            imp.tick()
+        assert db.count_hands() == 120
+    finally:
+        db.close()
+
+
+def test_dormant_file_append_is_imported(tmp_path, monkeypatch):
+    # sin watchdog: el indice se mira cada DISCOVERY_SECONDS
+    monkeypatch.setattr(importer, "DISCOVERY_SECONDS", 0.05)
+    folder = tmp_path / "hh"
+    folder.mkdir()
+    path = write_hh(folder / "table.txt", [hand_text(SIMPLE_HAND, 271000000000 + i) for i in range(3)])
+
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        imp = importer.HandHistoryImporter(
+            db, folder, window_seconds=1, idle_flush_seconds=0,
+            tail_min_interval=0.05, tail_max_interval=0.2,
+        )
+        deadline = time.time() + 10
+        while (db.count_hands() < 3 or str(path) in imp.scheduler) and time.time() < deadline:
+            imp.tick()
+            time.sleep(0.02)
+        assert db.count_hands() == 3
+        assert str(path) not in imp.scheduler  # dormido
+
+        with path.open("a", encoding="utf-8") as f:
+            f.write(hand_text(SIMPLE_HAND, 271000000003) + "\n\n\n")
+        deadline = time.time() + 3
+        while db.count_hands() < 4 and time.time() < deadline:
+            imp.tick()
+            time.sleep(0.02)
+        assert db.count_hands() == 4
+    finally:
+        db.close()
+
+
+def _imported(db: DB, no: int) -> bool:
+    return db.conn.execute("SELECT 1 FROM hands WHERE hand_no = ?", (str(no),)).fetchone() is not None
+
+
+def test_backlog_does_not_delay_live_hand(tmp_path, monkeypatch):
+    # historial grande de a bloques chicos: quedan cientos de pasos por hacer
+    monkeypatch.setattr(importer, "BULK_CHUNK", 3000)
+    monkeypatch.setattr(importer, "DISCOVERY_SECONDS", 0)
+    folder = tmp_path / "hh"
+    folder.mkdir()
+    old = write_hh(folder / "old.txt", [hand_text(SIMPLE_HAND, 274000001000 + i) for i in range(1500)])
+    ts = time.time() - 3600
+    os.utime(old, (ts, ts))
+    live = write_hh(folder / "live.txt", [hand_text(SIMPLE_HAND, 274000000000)])
+
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        imp = importer.HandHistoryImporter(db, folder, window_seconds=120, idle_flush_seconds=0, tail_min_interval=0)
+        imp.tick()
+        assert _imported(db, 274000000000)
+        for i in range(1, 4):
+            with live.open("a", encoding="utf-8") as f:
+                f.write(hand_text(SIMPLE_HAND, 274000000000 + i) + "\n\n\n")
+            # la mano nueva entra en la visita siguiente, con el historial a medias
+            imp.tick()
+            assert _imported(db, 274000000000 + i)
+            assert imp.backlog == 1
+    finally:
+        db.close()
+
+
+def _run(imp, db, expected: int, seconds: float = 10) -> None:
+    deadline = time.time() + seconds
+    while db.count_hands() < expected and time.time() < deadline:
+        imp.tick()
+
+
+def test_failed_insert_keeps_offset_and_carry(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "READ_CHUNK", 3000)
+    folder = tmp_path / "hh"
+    folder.mkdir()
+    path = write_hh(folder / "table.txt", [hand_text(SIMPLE_HAND, 272000000000 + i) for i in range(10)])
+
+    db = DB(tmp_path / "poker.sqlite3")
+    store = HandStore(tmp_path / "hands.bin")
+    try:
+        imp = importer.HandHistoryImporter(db, folder, window_seconds=120, idle_flush_seconds=0, hand_store=store)
+        insert = db.insert_hands
+        calls = []
+
+        def busy(batch, offsets=None):
+            calls.append(1)
+            if len(calls) == 2:
+                raise sqlite3.OperationalError("database is locked")
+            return insert(batch, offsets=offsets)
+
+        monkeypatch.setattr(db, "insert_hands", busy)
+        with pytest.raises(sqlite3.OperationalError):
+            _run(imp, db, 10)
+        rt = imp.runtime[str(path)]
+        # quedo en el fin del primer bloque commiteado
+        assert rt.read_offset == 3000
+        assert db.get_file_state(str(path))[1] == rt.read_offset - len(rt.carry)
+        # el archivo binario solo tiene lo commiteado
+        assert store.appended == db.count_hands()
+
+        _run(imp, db, 10)
+        assert db.count_hands() == 10
+        store.close()
+        reader = StoreReader(tmp_path / "hands.bin")
+        try:
+            assert sorted(h.hand_id for _, _, h in reader) == [str(272000000000 + i) for i in range(10)]
+        finally:
+            reader.close()
+    finally:
+        store.close()
+        db.close()
+
+
+def test_carry_is_bounded_without_hands(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "READ_CHUNK", 3000)
+    monkeypatch.setattr(importer, "MAX_CARRY", 8000)
+    folder = tmp_path / "hh"
+    folder.mkdir()
+    path = folder / "notes.txt"
+    path.write_text("no es una mano\n" * 4000 + "\n".join(hand_text(SIMPLE_HAND, 273000000000 + i) + "\n\n" for i in range(5)))
+
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        imp = importer.HandHistoryImporter(db, folder, window_seconds=120, idle_flush_seconds=0)
+        rt = None
+        deadline = time.time() + 10
+        while db.count_hands() < 5 and time.time() < deadline:
+            imp.tick()
+            rt = imp.runtime.get(str(path))
+            assert rt is None or len(rt.carry) <= 8000 + 3000
+        assert db.count_hands() == 5
+    finally:
+        db.close()
@@ -0,0 +1,126 @@
+"""
+kill -9 del importer a mitad de import: al reanudar tienen que quedar todas
+las manos, una sola vez, incluidas las que estaban en el carry.
+"""
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.database.db import DB
+from app.importer import HandHistoryImporter
+from hands import SIMPLE_HAND, hand_text, write_hh
+
+ROOT = Path(__file__).resolve().parent.parent
+FILES = 6
+HANDS_PER_FILE = 60
+TOTAL = FILES * HANDS_PER_FILE
+
+# Importer en otro proceso: historial de a bloques chicos (muchos commits) y
+# carry sin flush, para que el kill lo agarre con manos a medio leer.
+CHILD = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import app.importer as im
+from app.database.db import DB
+im.BULK_CHUNK = 3000
+db = DB(sys.argv[2])
+imp = im.HandHistoryImporter(db, sys.argv[3], window_seconds=120, idle_flush_seconds=10**6)
+while True:
+    imp.tick()
+    time.sleep(0.01)
+"""
+
+
+def _make_folder(folder: Path) -> None:
+    folder.mkdir()
+    old = time.time() - 3600
+    no = 260000000000
+    for i in range(FILES):
+        hands = [hand_text(SIMPLE_HAND, no + j) for j in range(HANDS_PER_FILE)]
+        no += HANDS_PER_FILE
+        path = write_hh(folder / f"table{i}.txt", hands)
+        # la mitad son mesas en juego (carril en vivo), el resto historial
+        if i % 2:
+            os.utime(path, (old, old))
+
+
+def _count(path: Path) -> int:
+    if not path.exists():
+        return 0
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        return conn.execute("SELECT count(*) FROM hands").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # el esquema todavia no esta
+    finally:
+        conn.close()
+
+
+def _table_counts(db: DB) -> dict:
+    counts = {
+        t: db.conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+        for t in ("hands", "seats", "posts", "result", "player_stats", "hand_player_facts")
+    }
+    # una mano sumada dos veces no agrega filas pero si cambia los totales
+    counts["stats_hands"] = db.conn.execute("SELECT sum(hands) FROM player_stats").fetchone()[0]
+    return counts
+
+
+def _import_all(db: DB, folder: Path) -> None:
+    imp = HandHistoryImporter(db, folder, window_seconds=120, idle_flush_seconds=0, tail_min_interval=0.01)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        imp.tick()
+        if not imp.backlog and not any(rt.carry for rt in imp.runtime.values()) and imp.runtime:
+            break
+        time.sleep(0.02)
+    imp.close()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="sin SIGKILL")
+@pytest.mark.parametrize("seed", [2, 7, 9, 5])
+def test_resume_after_kill9(tmp_path, seed):
+    folder = tmp_path / "hh"
+    _make_folder(folder)
+
+    ref = DB(tmp_path / "ref.sqlite3")
+    _import_all(ref, folder)
+    expected = _table_counts(ref)
+    ref.close()
+    assert expected["hands"] == TOTAL
+
+    db_path = tmp_path / "poker.sqlite3"
+    target = random.Random(seed).randint(1, TOTAL - 1)
+    child = subprocess.Popen(
+        [sys.executable, "-c", CHILD, str(ROOT), str(db_path), str(folder)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + 30
+        while _count(db_path) < target and time.time() < deadline:
+            time.sleep(0.005)
+    finally:
+        os.kill(child.pid, signal.SIGKILL)
+        child.wait()
+    before = _count(db_path)
+    # primero las mesas en juego (un archivo por commit, la ultima mano en el
+    # carry) y despues el historial de a pocas manos por commit
+    assert 0 < before < TOTAL
+
+    db = DB(db_path)
+    try:
+        _import_all(db, folder)
+        assert _table_counts(db) == expected
+        dups = db.conn.execute(
+            "SELECT count(*) FROM (SELECT hand_id FROM seats GROUP BY hand_id, player_id HAVING count(*) > 1)"
+        ).fetchone()[0]
+        assert dups == 0
+    finally:
+        db.close()
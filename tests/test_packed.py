@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+from app.database.db import DB
+from app.database.packed import register_functions
+from app.parser.parse_hand import parse_hand
+from hands import MULTI_RAISE_HAND, SIMPLE_HAND, hand_text
+
+_ROWS = """
+    SELECT h.hand_no, a.seq, a.street, p.player_name, a.action, a.amount, a.raise_from, a.raise_to, a.is_allin
+    FROM v_actions a JOIN hands h ON h.id = a.hand_id JOIN players p ON p.player_id = a.player_id
+    ORDER BY h.hand_no, a.seq
+"""
+
+
+def _db(path, packed: bool) -> DB:
+    db = DB(path, packed_actions=packed)
+    db.upsert_file("hh.txt", 0.0, 0)
+    file_id, _ = db.get_file_state("hh.txt")
+    hands = [parse_hand(hand_text(t, 310000000000 + i).encode()) for i, t in enumerate((MULTI_RAISE_HAND, SIMPLE_HAND))]
+    db.insert_hands([(file_id, h) for h in hands])
+    return db
+
+
+def test_v_actions_same_rows_in_both_modes(tmp_path):
+    rows, packed = _db(tmp_path / "rows.sqlite3", False), _db(tmp_path / "packed.sqlite3", True)
+    try:
+        assert packed.conn.execute("SELECT count(*) FROM actions").fetchone()[0] == 0
+        expected = [tuple(r) for r in rows.conn.execute(_ROWS)]
+        assert expected
+        assert [tuple(r) for r in packed.conn.execute(_ROWS)] == expected
+        with packed.reader() as conn:
+            assert [tuple(r) for r in conn.execute(_ROWS)] == expected
+    finally:
+        rows.close()
+        packed.close()
+
+
+def test_v_actions_needs_the_function(tmp_path):
+    path = tmp_path / "packed.sqlite3"
+    _db(path, True).close()
+    conn = sqlite3.connect(path)
+    try:
+        # conexion que no abrio DB: la vista pide unpack_actions
+        with pytest.raises(sqlite3.OperationalError, match="unpack_actions"):
+            conn.execute(_ROWS).fetchall()
+        register_functions(conn)
+        assert conn.execute("SELECT count(*) FROM v_actions").fetchone()[0] > 0
+    finally:
+        conn.close()
@@ -0,0 +1,24 @@
+from app.bench import parse_hand_baseline
+from app.parser.parse_hand import parse_hand
+from hands import MULTI_RAISE_HAND, SIMPLE_HAND, hand_text
+
+
+def test_view_matches_lines():
+    raw = hand_text(SIMPLE_HAND, 250000000002).encode()
+    # la vista llega sin salto final, como la corta split
+    view = memoryview(raw)[:-1]
+    assert parse_hand(view) == parse_hand(raw.splitlines(keepends=True))
+
+
+def test_crlf_lines():
+    raw = hand_text(SIMPLE_HAND, 250000000002).encode()
+    hand = parse_hand(memoryview(raw.replace(b"\n", b"\r\n")))
+    assert hand == parse_hand(raw)
+    assert len(hand.seats) == 5 and len(hand.actions) == 11
+
+
+def test_baseline_matches_dispatch():
+    # el "antes" de bench_parse tiene que dar lo mismo para que la comparacion valga
+    for template in (SIMPLE_HAND, MULTI_RAISE_HAND):
+        raw = hand_text(template, 250000000003).encode()
+        assert parse_hand_baseline(raw) == parse_hand(raw)
@@ -0,0 +1,110 @@
+import pytest
+
+from app.database.db import DB
+from app.database.rebuild import rebuild_player_stats, stats_from_store
+from app.parser.binfmt import HandStore, StoreReader
+from app.parser.parse_hand import parse_hand
+from app.parser.parse_stats import STATS_VERSION
+from hands import MULTI_RAISE_HAND, SIMPLE_HAND, hand_text
+
+
+def _import(db: DB, store: HandStore | None = None) -> None:
+    db.upsert_file("hh.txt", 0.0, 0)
+    file_id, _ = db.get_file_state("hh.txt")
+    hands = [parse_hand(hand_text(t, 290000000000 + i).encode()) for i, t in enumerate((MULTI_RAISE_HAND, SIMPLE_HAND))]
+    db.insert_hands([(file_id, h) for h in hands])
+    if store is not None:
+        for i, h in enumerate(hands):
+            store.append(file_id, i, h)
+        store.close()
+
+
+def _snapshot(db: DB) -> tuple:
+    stats = db.conn.execute("SELECT * FROM player_stats ORDER BY player_id, pos, players_seated, stack_bb_bucket").fetchall()
+    facts = db.conn.execute("SELECT * FROM hand_player_facts ORDER BY hand_id, player_id").fetchall()
+    return [tuple(r) for r in stats], [tuple(r) for r in facts]
+
+
+def test_rebuild_matches_import(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        _import(db)
+        before = _snapshot(db)
+        assert rebuild_player_stats(db) == 2
+        assert _snapshot(db) == before
+    finally:
+        db.close()
+
+
+def test_rebuild_refuses_legacy_hands(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    try:
+        _import(db)
+        # como las guardaba la version anterior: sin result y blinds con int()
+        legacy_id = db.conn.execute("SELECT id FROM hands WHERE hand_no = '290000000001'").fetchone()[0]
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM result WHERE hand_id = ?", (legacy_id,))
+            conn.execute("UPDATE posts SET amount = 0 WHERE hand_id = ?", (legacy_id,))
+        before = _snapshot(db)
+
+        with pytest.raises(RuntimeError, match="1 manos"):
+            rebuild_player_stats(db)
+        assert _snapshot(db) == before
+
+        rebuild_player_stats(db, skip_legacy=True)
+        stats, facts = _snapshot(db)
+        kept = {r[2] for r in before[1]} - {legacy_id}  # hand_id
+        assert kept and {r[2] for r in facts} == kept
+        assert db.conn.execute("SELECT sum(hands) FROM player_stats").fetchone()[0] == len(facts)
+    finally:
+        db.close()
+
+
+def test_rebuild_reads_store(tmp_path):
+    db = DB(tmp_path / "poker.sqlite3")
+    path = tmp_path / "hands.bin"
+    try:
+        _import(db, HandStore(path))
+        before = _snapshot(db)
+        # sin acciones en la BD las stats solo pueden salir del archivo
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM actions")
+            conn.execute("DELETE FROM hand_actions")
+        reader = StoreReader(path)
+        try:
+            assert rebuild_player_stats(db, store=reader) == 2
+            assert _snapshot(db) == before
+
+            names = dict(db.conn.execute("SELECT player_name, player_id FROM players"))
+            rows = sorted((names[r[0]],) + tuple(r[1:]) for r in stats_from_store(reader))
+            assert rows == before[0]
+        finally:
+            reader.close()
+    finally:
+        db.close()
+
+
+def _stats_version(db: DB) -> int:
+    return db.conn.execute("SELECT value FROM counters WHERE name = 'stats_version'").fetchone()[0]
+
+
+def test_old_stats_version_is_rebuilt_on_open(tmp_path):
+    path = tmp_path / "poker.sqlite3"
+    db = DB(path)
+    try:
+        assert _stats_version(db) == STATS_VERSION
+        _import(db)
+        before = _snapshot(db)
+        # como quedaban las BD de antes del contador, con los conteos viejos
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM counters WHERE name = 'stats_version'")
+            conn.execute("UPDATE player_stats SET check_raise_flop = check_raise_flop + 2, river_bet = river_bet + 1")
+    finally:
+        db.close()
+
+    db = DB(path)
+    try:
+        assert _snapshot(db) == before
+        assert _stats_version(db) == STATS_VERSION
+    finally:
+        db.close()
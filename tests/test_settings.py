@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from app.database.db import ImportCommit
+from app.settings import MockSettings
+
+
+class _CountingDB:
+    def __init__(self):
+        self.calls = 0
+
+    def count_hands(self) -> int:
+        self.calls += 1
+        return 10 * self.calls
+
+
+def _commit(generation: int) -> ImportCommit:
+    return ImportCommit(generation=generation, hands=1, player_ids=frozenset(), stat_keys=frozenset())
+
+
+def test_refresh_only_after_new_commit():
+    db = _CountingDB()
+    settings = MockSettings(db)
+    settings.refresh()
+    settings.refresh()
+    assert db.calls == 1
+    settings.onImportCommit(_commit(1))
+    settings.refresh()
+    settings.refresh()
+    assert db.calls == 2 and settings.getHandsCount() == 20